@@ -0,0 +1,8 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Intelligent Knowledge Aggregation Platform shared agent utilities package.
+"""
+
+__version__ = '0.1.0'
\ No newline at end of file
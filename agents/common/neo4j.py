@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Neo4j helpers shared by the knowledge and learning agents.
+"""
+
+import asyncio
+from typing import Dict, Any, Optional
+from neo4j import AsyncGraphDatabase, AsyncDriver
+
+# Relationship type of the knowledge enhancer's name similarity view. The view
+# is derived from entity names, so it does not connect entities and is left
+# out of validation and statistics
+NAME_SIMILAR_REL = "NAME_SIMILAR"
+
+
+# Driver shared by the validators and enhancers so the connection pool lives as long as the process
+_DRIVER: Optional[AsyncDriver] = None
+_DRIVER_LOCK = asyncio.Lock()
+
+
+async def get_driver(neo4j_config: Dict[str, Any]) -> AsyncDriver:
+    """Get the shared Neo4j driver, creating it on first use.
+    
+    Args:
+        neo4j_config: The `databases.neo4j` configuration section
+        
+    Returns:
+        Shared async Neo4j driver
+    """
+    global _DRIVER
+    async with _DRIVER_LOCK:
+        if _DRIVER is None:
+            driver = AsyncGraphDatabase.driver(
+                neo4j_config.get('uri', 'bolt://localhost:7687'),
+                auth=(neo4j_config.get('user', 'neo4j'), neo4j_config.get('password', 'password')),
+                max_connection_pool_size=neo4j_config.get('pool_size', 100),
+                connection_acquisition_timeout=60
+            )
+            
+            # Verify once here; the pool checks liveness when lending connections
+            try:
+                await driver.verify_connectivity()
+            except Exception:
+                await driver.close()
+                raise
+            _DRIVER = driver
+    return _DRIVER
+
+
+async def close_driver() -> None:
+    """Close the shared Neo4j driver and its connection pool."""
+    global _DRIVER
+    async with _DRIVER_LOCK:
+        if _DRIVER is not None:
+            await _DRIVER.close()
+            _DRIVER = None
+
+
+def quote_name(name: str) -> str:
+    """Quote a label or relationship type for use in a Cypher pattern."""
+    return "`" + name.replace("`", "``") + "`"
@@ -101,6 +101,15 @@ class KnowledgeAgent:
         # Close message broker connection
         await self.message_broker.close()
         
+        # Release the graph builder's Neo4j connection pool
+        await self.graph_builder.aclose()
+        
+        # Close the Neo4j driver shared by validators and enhancers
+        await self.knowledge_validator.aclose()
+        
+        # Shut down the relation extractor's chunk-scanning worker processes
+        self.relation_extractor.close()
+        
         self.is_running = False
         logger.info(f"Knowledge agent {self.agent_id} stopped")
     
@@ -7,15 +7,37 @@ Graph builder module for constructing knowledge graphs.
 
 import logging
 import asyncio
-import time
-from typing import Dict, List, Any, Optional
+import os
+import re
+from collections import defaultdict
+from typing import Dict, List, Any, Optional, Tuple
 import uuid
 from datetime import datetime
-from neo4j import AsyncGraphDatabase, AsyncDriver
+from neo4j import AsyncGraphDatabase, AsyncDriver, Bookmarks
+
+from agents.common.neo4j import quote_name, NAME_SIMILAR_REL
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Labels and relationship types cannot be parameterized in Cypher, so they
+# are validated before being interpolated into a query
+_LABEL_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]{0,63}$")
+
+
+
+def _generate_ids(count: int) -> List[str]:
+    """Generate random UUID4 strings from a single urandom call.
+    
+    Args:
+        count: Number of IDs to generate
+        
+    Returns:
+        List of UUID strings
+    """
+    buf = os.urandom(16 * count)
+    return [str(uuid.UUID(bytes=buf[i:i + 16], version=4)) for i in range(0, 16 * count, 16)]
+
 
 class GraphBuilder:
     """Builder for creating and updating knowledge graphs."""
@@ -29,20 +51,50 @@ class GraphBuilder:
         self.config = config
         
         # Neo4j connection settings
-        self.neo4j_uri = config.get('databases', {}).get('neo4j', {}).get('uri', 'bolt://localhost:7687')
-        self.neo4j_user = config.get('databases', {}).get('neo4j', {}).get('user', 'neo4j')
-        self.neo4j_password = config.get('databases', {}).get('neo4j', {}).get('password', 'password')
+        neo4j_config = config.get('databases', {}).get('neo4j', {})
+        self.neo4j_uri = neo4j_config.get('uri', 'bolt://localhost:7687')
+        self.neo4j_user = neo4j_config.get('user', 'neo4j')
+        self.neo4j_password = neo4j_config.get('password', 'password')
+        self.neo4j_database = neo4j_config.get('database', 'neo4j')
+        self.neo4j_pool_size = neo4j_config.get('pool_size', 100)
+        self.neo4j_fetch_size = neo4j_config.get('fetch_size', 10000)
+        
+        # Write batching: rows per UNWIND transaction and concurrent transactions
+        self.batch_size = neo4j_config.get('batch_size', 10000)
+        self._write_semaphore = asyncio.Semaphore(neo4j_config.get('max_concurrency', 8))
         
-        # Initialize Neo4j driver
+        # Neo4j driver, created on first use and kept for the agent's lifetime
         self.driver = None
         
+        # Labels that already have an index on their id property
+        self._indexed_labels = set()
+        
+        # Write queries keyed by label / (relationship type, from label, to label, return ids),
+        # prebuilt for the configured schema and memoized for any other label
+        self._entity_cypher: Dict[str, str] = {
+            label: self._build_entity_cypher(label)
+            for label in neo4j_config.get('entity_labels', ['Entity'])
+            if _LABEL_RE.match(label)
+        }
+        self._relationship_cypher: Dict[Tuple[str, str, str, bool], str] = {
+            (rel_type, 'Entity', 'Entity', False): self._build_relationship_cypher(rel_type, 'Entity', 'Entity')
+            for rel_type in neo4j_config.get('relationship_types', ['RELATED_TO'])
+            if _LABEL_RE.match(rel_type)
+        }
+        
+        # Whether the APOC plugin is installed, detected on connect
+        self._has_apoc = False
+        
         logger.info("Graph builder initialized")
     
     async def build(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
         """Build or update the knowledge graph.
         
         Args:
-            task_data: Task data containing the entities and relationships to add
+            task_data: Task data containing the entities and relationships to add.
+                Set `return_ids` to include the written entity and relationship
+                IDs in the results, and `include_graph_stats` to query
+                statistics for the whole graph after writing.
             
         Returns:
             Operation results
@@ -50,185 +102,429 @@ class GraphBuilder:
         entities = task_data.get('entities', [])
         relationships = task_data.get('relationships', [])
         source_id = task_data.get('source_id')
+        return_ids = task_data.get('return_ids', False)
+        include_graph_stats = task_data.get('include_graph_stats', False)
         
         if not entities and not relationships:
             raise ValueError("No entities or relationships provided")
             
         logger.info(f"Building knowledge graph with {len(entities)} entities and {len(relationships)} relationships")
         
-        # Connect to Neo4j
+        # Connect to Neo4j (no-op once the driver is established)
         await self._connect()
         
-        # Process the operation
-        try:
-            # Create entities
-            entity_ids = await self._create_entities(entities, source_id)
-            
-            # Create relationships
-            relationship_ids = await self._create_relationships(relationships, source_id)
-            
-            # Get statistics about the operation
+        # Create entities
+        created_entities, entity_ids, entity_bookmarks = await self._create_entities(
+            entities, source_id, return_ids
+        )
+        
+        # Create relationships, causally chained after the entity writes
+        created_relationships, relationship_ids = await self._create_relationships(
+            relationships, source_id, entity_bookmarks, return_ids
+        )
+        
+        # Whole-graph statistics cost extra queries, so by default only the
+        # write counters of this operation are reported
+        if include_graph_stats:
             stats = await self._get_graph_statistics()
-            
-            return {
-                "operation_id": str(uuid.uuid4()),
-                "timestamp": datetime.now().isoformat(),
-                "source_id": source_id,
-                "created_entities": len(entity_ids),
-                "created_relationships": len(relationship_ids),
-                "entity_ids": entity_ids,
-                "relationship_ids": relationship_ids,
-                "graph_statistics": stats
+        else:
+            stats = {
+                "created_nodes": created_entities,
+                "created_relationships": created_relationships
             }
+        
+        results = {
+            "operation_id": str(uuid.uuid4()),
+            "timestamp": datetime.now().isoformat(),
+            "source_id": source_id,
+            "created_entities": created_entities,
+            "created_relationships": created_relationships,
+            "graph_statistics": stats
+        }
+        
+        if return_ids:
+            results["entity_ids"] = entity_ids
+            results["relationship_ids"] = relationship_ids
             
-        finally:
-            # Close the Neo4j connection
-            await self._close()
+        return results
     
     async def _connect(self) -> None:
         """Connect to Neo4j database."""
-        if self.driver is None:
-            self.driver = AsyncGraphDatabase.driver(
-                self.neo4j_uri, 
-                auth=(self.neo4j_user, self.neo4j_password)
-            )
+        if self.driver is not None:
+            return
+            
+        self.driver = AsyncGraphDatabase.driver(
+            self.neo4j_uri, 
+            auth=(self.neo4j_user, self.neo4j_password),
+            max_connection_pool_size=self.neo4j_pool_size,
+            connection_acquisition_timeout=60,
+            max_transaction_retry_time=30,
+            keep_alive=True
+        )
             
         # Test the connection
         try:
-            async with self.driver.session() as session:
+            async with self._session() as session:
                 result = await session.run("RETURN 1 as num")
                 record = await result.single()
                 if record and record.get("num") == 1:
                     logger.info("Connected to Neo4j")
                 else:
                     raise Exception("Failed to verify Neo4j connection")
+                
+                # Every entity also carries the Entity label, so a unique
+                # constraint on it gives id lookups an index to seek on. It is
+                # only an optimization, so the connection does not depend on it
+                try:
+                    result = await session.run(
+                        "CREATE CONSTRAINT entity_id IF NOT EXISTS "
+                        "FOR (e:Entity) REQUIRE e.id IS UNIQUE"
+                    )
+                    await result.consume()
+                    self._indexed_labels.add("Entity")
+                except Exception as e:
+                    logger.warning(f"Could not create index: {e}")
+                
+            self._has_apoc = await self._detect_apoc()
         except Exception as e:
             logger.error(f"Error connecting to Neo4j: {e}")
+            await self.aclose()
             raise
     
-    async def _close(self) -> None:
-        """Close the Neo4j connection."""
+    async def _detect_apoc(self) -> bool:
+        """Check whether the APOC plugin is available on the server.
+        
+        Returns:
+            True if APOC procedures can be called
+        """
+        try:
+            async with self._session() as session:
+                result = await session.run("RETURN apoc.version() as version")
+                await result.single()
+            return True
+        except Exception:
+            logger.info("APOC not available, using Cypher queries for graph statistics")
+            return False
+    
+    async def _ensure_label_index(self, session, label: str) -> None:
+        """Create an index on the id property of a label if not done already.
+        
+        Args:
+            session: Open Neo4j session
+            label: Validated node label
+        """
+        if label in self._indexed_labels:
+            return
+            
+        index_name = "_".join(re.findall(r"\w+", label.lower())) + "_id"
+        result = await session.run(
+            f"CREATE INDEX {quote_name(index_name)} IF NOT EXISTS "
+            f"FOR (n:{quote_name(label)}) ON (n.id)"
+        )
+        await result.consume()
+        self._indexed_labels.add(label)
+    
+    async def aclose(self) -> None:
+        """Close the Neo4j driver and its connection pool.
+        
+        Only called when the owning agent shuts down.
+        """
         if self.driver:
             await self.driver.close()
             self.driver = None
     
-    async def _create_entities(self, entities: List[Dict[str, Any]], source_id: Optional[str]) -> List[str]:
+    def _session(self, bookmarks: Optional[Bookmarks] = None, fetch_size: int = 1000):
+        """Open a session from the driver's pool on the configured database.
+        
+        Args:
+            bookmarks: Bookmarks of earlier writes the session must observe
+            fetch_size: Records pulled per round trip (driver default 1000)
+        """
+        return self.driver.session(
+            database=self.neo4j_database,
+            bookmarks=bookmarks,
+            fetch_size=fetch_size
+        )
+    
+    async def _create_entities(self, entities: List[Dict[str, Any]], source_id: Optional[str],
+                               return_ids: bool = False) -> Tuple[int, List[str], Bookmarks]:
         """Create entities in the knowledge graph.
         
         Args:
             entities: List of entities to create
             source_id: Source identifier
+            return_ids: Whether to collect the written entity IDs
             
         Returns:
-            List of created entity IDs
+            Number of created entities, the written entity IDs (empty unless
+            requested) and the bookmarks of the writes
         """
+        created_count = 0
         created_ids = []
+        bookmarks = Bookmarks()
         
         if not entities:
-            return created_ids
+            return created_count, created_ids, bookmarks
+        
+        # Generate IDs for entities without one up front
+        new_ids = iter(_generate_ids(sum(1 for entity in entities if not entity.get('id'))))
+        
+        # Group entities by label so each label is written with one query
+        groups = defaultdict(list)
+        for entity in entities:
+            entity_id = entity.get('id') or next(new_ids)
+            entity_type = entity.get('type', 'Entity')
+            properties = entity.get('properties', {})
             
-        async with self.driver.session() as session:
-            for entity in entities:
-                # Generate a unique ID if not provided
-                entity_id = entity.get('id') or str(uuid.uuid4())
-                entity_type = entity.get('type', 'Entity')
-                properties = entity.get('properties', {})
-                
-                # Add metadata
-                properties['created_at'] = datetime.now().isoformat()
-                if source_id:
-                    properties['source_id'] = source_id
+            if not _LABEL_RE.match(entity_type):
+                logger.warning(f"Invalid type {entity_type!r} for entity {entity_id}, using Entity")
+                entity_type = 'Entity'
+            
+            groups[entity_type].append({"id": entity_id, "props": properties})
+            
+        # Labels are independent of each other, so write them concurrently
+        batches = await asyncio.gather(*(
+            self._write_entity_group(entity_type, batch, source_id, return_ids)
+            for entity_type, rows in groups.items()
+            for batch in self._split_batches(rows)
+        ))
+        
+        for count, ids, batch_bookmarks in batches:
+            created_count += count
+            created_ids.extend(ids)
+            bookmarks += batch_bookmarks
                 
-                # Create entity
-                query = (
-                    f"MERGE (e:{entity_type} {{id: $id}}) "
-                    "ON CREATE SET e += $properties, e.created_at = datetime() "
-                    "ON MATCH SET e += $properties, e.updated_at = datetime() "
-                    "RETURN e.id as id"
+        return created_count, created_ids, bookmarks
+    
+    async def _write_entity_group(self, entity_type: str, rows: List[Dict[str, Any]],
+                                  source_id: Optional[str],
+                                  return_ids: bool) -> Tuple[int, List[str], Bookmarks]:
+        """Write one batch of entities sharing a label in a dedicated session.
+        
+        Args:
+            entity_type: Validated entity label
+            rows: Entity rows with id and props
+            source_id: Source identifier
+            return_ids: Whether to return the written entity IDs
+            
+        Returns:
+            Number of created entities, the written entity IDs and the
+            session's bookmarks
+        """
+        # Reuse the same query text per label so the server's plan cache hits
+        query = self._entity_cypher.get(entity_type) or self._entity_cypher.setdefault(
+            entity_type, self._build_entity_cypher(entity_type)
+        )
+        
+        try:
+            async with self._write_semaphore, self._session() as session:
+                await self._ensure_label_index(session, entity_type)
+                _, counters = await session.execute_write(
+                    self._write_batch, query, rows, source_id or None
                 )
-                
-                try:
-                    result = await session.run(
-                        query,
-                        {
-                            "id": entity_id,
-                            "properties": properties
-                        }
-                    )
-                    record = await result.single()
-                    if record:
-                        created_ids.append(record.get("id"))
-                except Exception as e:
-                    logger.error(f"Error creating entity {entity_id}: {e}")
-                
-                # Simulate processing time for each entity
-                await asyncio.sleep(0.01)
-                
-        return created_ids
+                bookmarks = await session.last_bookmarks()
+            # MERGE always writes every row, so the ids are the ones we sent
+            ids = [row["id"] for row in rows] if return_ids else []
+            return counters.nodes_created, ids, bookmarks
+        except Exception as e:
+            logger.error(
+                f"Error creating {len(rows)} entities of type {entity_type}: {e}; "
+                f"rejected ids: {[row['id'] for row in rows]}"
+            )
+            return 0, [], Bookmarks()
     
-    async def _create_relationships(self, relationships: List[Dict[str, Any]], source_id: Optional[str]) -> List[str]:
+    async def _create_relationships(self, relationships: List[Dict[str, Any]], source_id: Optional[str],
+                                    bookmarks: Optional[Bookmarks] = None,
+                                    return_ids: bool = False) -> Tuple[int, List[str]]:
         """Create relationships in the knowledge graph.
         
         Args:
             relationships: List of relationships to create
             source_id: Source identifier
+            bookmarks: Bookmarks of the entity writes the relationships depend on
+            return_ids: Whether to collect the written relationship IDs
             
         Returns:
-            List of created relationship IDs
+            Number of created relationships and the written relationship IDs
+            (empty unless requested)
         """
+        created_count = 0
         created_ids = []
         
         if not relationships:
-            return created_ids
+            return created_count, created_ids
+        
+        # Generate IDs for relationships without one up front
+        new_ids = iter(_generate_ids(sum(1 for rel in relationships if not rel.get('id'))))
+        
+        # Group relationships by type and endpoint labels so each combination
+        # is written with one query
+        groups = defaultdict(list)
+        for relationship in relationships:
+            # Extract relationship data
+            rel_id = relationship.get('id') or next(new_ids)
+            rel_type = relationship.get('type', 'RELATED_TO')
+            from_id = relationship.get('from_id')
+            to_id = relationship.get('to_id')
+            properties = relationship.get('properties', {})
             
-        async with self.driver.session() as session:
-            for relationship in relationships:
-                # Extract relationship data
-                rel_id = relationship.get('id') or str(uuid.uuid4())
-                rel_type = relationship.get('type', 'RELATED_TO')
-                from_id = relationship.get('from_id')
-                to_id = relationship.get('to_id')
-                properties = relationship.get('properties', {})
-                
-                if not from_id or not to_id:
-                    logger.warning(f"Skipping relationship without from_id or to_id: {rel_id}")
-                    continue
-                
-                # Add metadata
-                properties['created_at'] = datetime.now().isoformat()
-                if source_id:
-                    properties['source_id'] = source_id
+            if not from_id or not to_id:
+                logger.warning(f"Skipping relationship without from_id or to_id: {rel_id}")
+                continue
+            
+            if not _LABEL_RE.match(rel_type):
+                logger.warning(f"Invalid type {rel_type!r} for relationship {rel_id}, using RELATED_TO")
+                rel_type = 'RELATED_TO'
+            
+            # Endpoint labels let the lookups seek on a label's id index
+            from_label = relationship.get('from_label', 'Entity')
+            to_label = relationship.get('to_label', 'Entity')
+            if not _LABEL_RE.match(from_label):
+                from_label = 'Entity'
+            if not _LABEL_RE.match(to_label):
+                to_label = 'Entity'
+            
+            groups[(rel_type, from_label, to_label)].append({
+                "id": rel_id,
+                "from_id": from_id,
+                "to_id": to_id,
+                "props": properties
+            })
+            
+        # The sessions wait on the entity bookmarks, so every batch sees the
+        # committed entities and relationship types can be written concurrently
+        batches = await asyncio.gather(*(
+            self._write_relationship_group(*key, batch, source_id, bookmarks, return_ids)
+            for key, rows in groups.items()
+            for batch in self._split_batches(rows)
+        ))
+        
+        for count, ids in batches:
+            created_count += count
+            created_ids.extend(ids)
                 
-                # Create relationship
-                query = (
-                    "MATCH (from {id: $from_id}) "
-                    "MATCH (to {id: $to_id}) "
-                    f"MERGE (from)-[r:{rel_type} {{id: $id}}]->(to) "
-                    "ON CREATE SET r += $properties, r.created_at = datetime() "
-                    "ON MATCH SET r += $properties, r.updated_at = datetime() "
-                    "RETURN r.id as id"
+        return created_count, created_ids
+    
+    async def _write_relationship_group(self, rel_type: str, from_label: str, to_label: str,
+                                        rows: List[Dict[str, Any]], source_id: Optional[str],
+                                        bookmarks: Optional[Bookmarks],
+                                        return_ids: bool) -> Tuple[int, List[str]]:
+        """Write one batch of relationships sharing a type in a dedicated session.
+        
+        Args:
+            rel_type: Validated relationship type
+            from_label: Validated label of the start nodes
+            to_label: Validated label of the end nodes
+            rows: Relationship rows with id, from_id, to_id and props
+            source_id: Source identifier
+            bookmarks: Bookmarks the session must observe before writing
+            return_ids: Whether to return the written relationship IDs
+            
+        Returns:
+            Number of created relationships and the written relationship IDs
+        """
+        key = (rel_type, from_label, to_label, return_ids)
+        query = self._relationship_cypher.get(key) or self._relationship_cypher.setdefault(
+            key, self._build_relationship_cypher(rel_type, from_label, to_label, return_ids)
+        )
+        
+        try:
+            async with self._write_semaphore, self._session(bookmarks) as session:
+                await self._ensure_label_index(session, from_label)
+                await self._ensure_label_index(session, to_label)
+                ids, counters = await session.execute_write(
+                    self._write_batch, query, rows, source_id or None
                 )
-                
-                try:
-                    result = await session.run(
-                        query,
-                        {
-                            "id": rel_id,
-                            "from_id": from_id,
-                            "to_id": to_id,
-                            "properties": properties
-                        }
-                    )
-                    record = await result.single()
-                    if record:
-                        created_ids.append(record.get("id"))
-                except Exception as e:
-                    logger.error(f"Error creating relationship {rel_id}: {e}")
-                
-                # Simulate processing time for each relationship
-                await asyncio.sleep(0.01)
-                
-        return created_ids
+            return counters.relationships_created, ids or []
+        except Exception as e:
+            logger.error(f"Error creating {len(rows)} relationships of type {rel_type}: {e}")
+            return 0, []
+    
+    @staticmethod
+    def _build_entity_cypher(label: str) -> str:
+        """Build the UNWIND query merging entities of one label.
+        
+        Args:
+            label: Validated entity label
+            
+        Returns:
+            Cypher query taking `$rows` and `$source_id`
+        """
+        # Merge on the Entity label the id constraint is on, so an id already
+        # used by an entity of another type updates that node rather than
+        # violating the constraint and failing the whole batch
+        return (
+            "UNWIND $rows AS row "
+            "MERGE (e:Entity {id: row.id}) "
+            "ON CREATE SET e += row.props, e.created_at = datetime() "
+            "ON MATCH SET e += row.props, e.updated_at = datetime() "
+            f"SET e:{label}, e.source_id = coalesce($source_id, e.source_id)"
+        )
+    
+    @staticmethod
+    def _build_relationship_cypher(rel_type: str, from_label: str, to_label: str,
+                                   return_ids: bool = False) -> str:
+        """Build the UNWIND query merging relationships of one type.
+        
+        Args:
+            rel_type: Validated relationship type
+            from_label: Validated label of the start nodes
+            to_label: Validated label of the end nodes
+            return_ids: Whether the query returns the written IDs
+            
+        Returns:
+            Cypher query taking `$rows` and `$source_id`
+        """
+        query = (
+            "UNWIND $rows AS row "
+            f"MATCH (from:{from_label} {{id: row.from_id}}) "
+            f"MATCH (to:{to_label} {{id: row.to_id}}) "
+            f"MERGE (from)-[r:{rel_type} {{id: row.id}}]->(to) "
+            "ON CREATE SET r += row.props, r.created_at = datetime() "
+            "ON MATCH SET r += row.props, r.updated_at = datetime() "
+            "SET r.source_id = coalesce($source_id, r.source_id)"
+        )
+        
+        # Rows whose endpoints are missing are not written, so the ids have
+        # to come back from the server; they are collected into one record
+        if return_ids:
+            query += " RETURN collect(r.id) as ids"
+            
+        return query
+    
+    def _split_batches(self, rows: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Split rows into batches of at most `batch_size` rows.
+        
+        Args:
+            rows: Rows to split
+            
+        Returns:
+            List of row batches
+        """
+        return [rows[i:i + self.batch_size] for i in range(0, len(rows), self.batch_size)]
+    
+    @staticmethod
+    async def _write_batch(tx, query: str, rows: List[Dict[str, Any]],
+                           source_id: Optional[str]) -> Tuple[Optional[List[str]], Any]:
+        """Transaction function writing one UNWIND batch.
+        
+        Run through `execute_write`, so the whole batch commits once and is
+        retried by the driver on transient errors.
+        
+        Args:
+            tx: Managed transaction
+            query: UNWIND query, optionally returning an `ids` list
+            rows: Rows bound to `$rows`
+            source_id: Source identifier bound to `$source_id`
+            
+        Returns:
+            The returned IDs (None if the query returns nothing) and the
+            summary's write counters
+        """
+        result = await tx.run(query, rows=rows, source_id=source_id)
+        record = await result.single()
+        summary = await result.consume()
+        return (record.get("ids") if record else None), summary.counters
     
     async def _get_graph_statistics(self) -> Dict[str, Any]:
         """Get statistics about the knowledge graph.
@@ -236,46 +532,79 @@ class GraphBuilder:
         Returns:
             Dictionary of graph statistics
         """
-        stats = {
-            "total_nodes": 0,
-            "total_relationships": 0,
-            "node_types": {},
-            "relationship_types": {}
-        }
-        
-        async with self.driver.session() as session:
-            # Count total nodes
-            result = await session.run("MATCH (n) RETURN count(n) as count")
-            record = await result.single()
-            if record:
-                stats["total_nodes"] = record.get("count")
+        if self._has_apoc:
+            # apoc.meta.stats reads the count store, so no scan is needed
+            async with self._session(fetch_size=self.neo4j_fetch_size) as session:
+                result = await session.run(
+                    "CALL apoc.meta.stats() "
+                    "YIELD nodeCount, relCount, labels, relTypesCount "
+                    "RETURN nodeCount, relCount, labels, relTypesCount"
+                )
+                record = await result.single()
                 
-            # Count total relationships
-            result = await session.run("MATCH ()-[r]->() RETURN count(r) as count")
-            record = await result.single()
             if record:
-                stats["total_relationships"] = record.get("count")
-                
-            # Count nodes by type
-            result = await session.run(
+                # The enhancer's name similarity view is derived data
+                rel_types = dict(record.get("relTypesCount") or {})
+                view_relationships = rel_types.pop(NAME_SIMILAR_REL, 0)
+                return {
+                    "total_nodes": record.get("nodeCount"),
+                    "total_relationships": record.get("relCount") - view_relationships,
+                    "node_types": dict(record.get("labels") or {}),
+                    "relationship_types": rel_types
+                }
+        
+        # Each query runs in its own pooled session so they execute in parallel
+        total_nodes, total_relationships, node_types, rel_types = await asyncio.gather(
+            self._fetch_count("MATCH (n) RETURN count(n) as count"),
+            self._fetch_count(
+                "CALL { MATCH ()-[r]->() RETURN count(r) as total } "
+                f"CALL {{ MATCH ()-[r:{NAME_SIMILAR_REL}]->() RETURN count(r) as view }} "
+                "RETURN total - view as count"
+            ),
+            self._fetch_grouped_counts(
                 "MATCH (n) "
                 "WITH labels(n) as labels "
                 "UNWIND labels as label "
-                "RETURN label, count(label) as count"
-            )
-            node_types = {}
-            async for record in result:
-                node_types[record.get("label")] = record.get("count")
-            stats["node_types"] = node_types
-            
-            # Count relationships by type
-            result = await session.run(
+                "RETURN label as key, count(label) as count"
+            ),
+            self._fetch_grouped_counts(
                 "MATCH ()-[r]->() "
-                "RETURN type(r) as type, count(r) as count"
+                f"WHERE type(r) <> '{NAME_SIMILAR_REL}' "
+                "RETURN type(r) as key, count(r) as count"
             )
-            rel_types = {}
-            async for record in result:
-                rel_types[record.get("type")] = record.get("count")
-            stats["relationship_types"] = rel_types
+        )
+        
+        return {
+            "total_nodes": total_nodes,
+            "total_relationships": total_relationships,
+            "node_types": node_types,
+            "relationship_types": rel_types
+        }
+    
+    async def _fetch_count(self, query: str) -> int:
+        """Run a single-value count query.
+        
+        Args:
+            query: Cypher query returning a `count` column
             
-        return stats 
\ No newline at end of file
+        Returns:
+            The count, or 0 if no record was returned
+        """
+        async with self._session(fetch_size=self.neo4j_fetch_size) as session:
+            result = await session.run(query)
+            record = await result.single()
+            return record.get("count") if record else 0
+    
+    async def _fetch_grouped_counts(self, query: str) -> Dict[str, int]:
+        """Run a query returning counts grouped by key.
+        
+        Args:
+            query: Cypher query returning `key` and `count` columns
+            
+        Returns:
+            Dictionary mapping each key to its count
+        """
+        async with self._session(fetch_size=self.neo4j_fetch_size) as session:
+            result = await session.run(query)
+            # Pull every (key, count) pair at once instead of record by record
+            return dict(await result.values("key", "count"))
@@ -7,15 +7,22 @@ Knowledge validator module for validating and maintaining knowledge graph integr
 
 import logging
 import asyncio
+import copy
 import time
+from collections import OrderedDict
 from typing import Dict, List, Any, Optional, Tuple, Set
 import uuid
 from datetime import datetime
-from neo4j import AsyncGraphDatabase, AsyncDriver
+from neo4j import READ_ACCESS, WRITE_ACCESS
+
+from agents.common.neo4j import get_driver, close_driver, quote_name, NAME_SIMILAR_REL
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Matches node `n` when `$entity_types` is empty or `n` has one of the types
+_TYPE_FILTER = "(size($entity_types) = 0 OR any(l IN labels(n) WHERE l IN $entity_types))"
+
 
 class KnowledgeValidator:
     """Validator for ensuring knowledge graph integrity and consistency."""
@@ -29,12 +36,38 @@ class KnowledgeValidator:
         self.config = config
         
         # Neo4j connection settings
-        self.neo4j_uri = config.get('databases', {}).get('neo4j', {}).get('uri', 'bolt://localhost:7687')
-        self.neo4j_user = config.get('databases', {}).get('neo4j', {}).get('user', 'neo4j')
-        self.neo4j_password = config.get('databases', {}).get('neo4j', {}).get('password', 'password')
+        self.neo4j_config = config.get('databases', {}).get('neo4j', {})
+        self.neo4j_database = self.neo4j_config.get('database', 'neo4j')
         
-        # Initialize Neo4j driver
+        # Labels whose id property is indexed for the fix lookups
+        self.entity_labels = self.neo4j_config.get('entity_labels', ['Entity'])
+        
+        # Shared Neo4j driver, fetched on first validation
         self.driver = None
+        self._indexes_ready = False
+        
+        # Relationship types checked by the validation rules
+        self.conflicting_pairs = [
+            ["IS_A", "PART_OF"],
+            ["CAUSE_EFFECT", "EFFECT_CAUSE"]
+        ]
+        self.hierarchical_rels = ["IS_A", "PART_OF"]
+        
+        # Maximum number of cycles reported
+        self.max_cycles = config.get('validation', {}).get('max_cycles', 1000)
+        
+        # Graph statistics reused by validations within the TTL, as
+        # (monotonic time, statistics); dropped whenever fixes change the graph
+        self.stats_ttl = config.get('validation', {}).get('stats_ttl', 300)
+        self._stats_cache = None
+        
+        # Rows each inner transaction of a fix commits
+        self.fix_batch_size = int(config.get('validation', {}).get('fix_batch_size', 1000))
+        
+        # Recent validation results, keyed by the validation parameters
+        self.result_cache_ttl = config.get('validation', {}).get('result_cache_ttl', 30)
+        self.result_cache_size = config.get('validation', {}).get('result_cache_size', 64)
+        self._result_cache = OrderedDict()
         
         # Validation rules
         self.rules = [
@@ -76,119 +109,313 @@ class KnowledgeValidator:
         relationship_types = task_data.get('relationship_types', [])
         fix_issues = task_data.get('fix_issues', False)
         
+        # Fixes only need ids, so node labels are left out of fix runs by default
+        include_labels = task_data.get('include_labels', not fix_issues)
+        
         logger.info(f"Validating knowledge graph with rules: {rules}")
         
+        # Fixes change the graph, so they are never served from or kept in the cache
+        if fix_issues:
+            self._result_cache.clear()
+            cache_key = None
+        else:
+            cache_key = (
+                tuple(sorted(rules)),
+                tuple(sorted(entity_types)),
+                tuple(sorted(relationship_types)),
+                include_labels
+            )
+            cached = self._get_cached_result(cache_key)
+            if cached is not None:
+                logger.info("Returning cached validation results")
+                return cached
+        
+        unknown_rules = set(rules) - self._VALIDATORS.keys()
+        if unknown_rules:
+            logger.warning(f"Ignoring unknown validation rules: {sorted(unknown_rules)}")
+        
+        applicable_rules = [rule for rule in self.rules if rule["name"] in rules]
+        
+        # Nothing to check, so don't touch the database
+        if not applicable_rules:
+            return self._build_result([], {})
+        
         # Connect to Neo4j
         await self._connect()
         
-        # Process the validation
-        try:
-            # Run the validations
-            validation_results = []
-            
-            for rule in self.rules:
-                if rule["name"] in rules:
-                    logger.info(f"Running validation rule: {rule['name']}")
-                    
-                    # Run the specific validation rule
-                    result = await getattr(self, f"_validate_{rule['name']}")(
-                        entity_types, relationship_types
-                    )
-                    
-                    # Add to results
-                    validation_results.append({
-                        "rule": rule["name"],
-                        "description": rule["description"],
-                        "severity": rule["severity"],
-                        "issues": result["issues"],
-                        "issue_count": len(result["issues"]),
-                        "fix_count": 0
-                    })
-                    
-                    # Fix issues if requested
-                    if fix_issues and result["issues"]:
-                        logger.info(f"Fixing issues for rule: {rule['name']}")
-                        
-                        # Run the fix for this rule
-                        fix_result = await getattr(self, f"_fix_{rule['name']}")(result["issues"])
-                        
-                        # Update the validation result with fix information
-                        validation_results[-1]["fix_count"] = fix_result["fixed_count"]
-                        validation_results[-1]["fixed"] = fix_result["fixed"]
-            
-            # Get overall statistics
-            stats = await self._get_graph_statistics()
-            
-            return {
-                "operation_id": str(uuid.uuid4()),
-                "timestamp": datetime.now().isoformat(),
-                "validation_results": validation_results,
-                "total_issues": sum(r["issue_count"] for r in validation_results),
-                "total_fixed": sum(r.get("fix_count", 0) for r in validation_results),
-                "graph_statistics": stats
-            }
+        # Process the validation; an empty graph cannot have any issues
+        if await self._is_graph_empty():
+            results = [{"issues": []} for _ in applicable_rules]
+        else:
+            # The rules only read the graph, so run them concurrently; each
+            # validator opens its own session from the pool
+            results = await asyncio.gather(*(
+                self._run_rule(rule, entity_types, relationship_types, include_labels)
+                for rule in applicable_rules
+            ))
+        
+        validation_results = []
+        
+        for rule, result in zip(applicable_rules, results):
+            # Add to results
+            validation_results.append({
+                "rule": rule["name"],
+                "description": rule["description"],
+                "severity": rule["severity"],
+                "issues": result["issues"],
+                "issue_count": len(result["issues"]),
+                "fix_count": 0
+            })
+            
+            # Fix issues if requested; fixes write, so they run one rule at a time
+            if fix_issues and result["issues"]:
+                logger.info(f"Fixing issues for rule: {rule['name']}")
+                
+                # Run the fix for this rule
+                fix_result = await self._FIXERS[rule["name"]](self, result["issues"])
+                
+                # Update the validation result with fix information
+                validation_results[-1]["fix_count"] = fix_result["fixed_count"]
+                validation_results[-1]["fixed"] = fix_result["fixed"]
+        
+        # Get overall statistics; cached statistics are stale once fixes were made
+        if any(r["fix_count"] for r in validation_results):
+            self._stats_cache = None
+        stats = await self._get_cached_statistics()
+        
+        result = self._build_result(validation_results, stats)
+        if cache_key is not None:
+            self._cache_result(cache_key, result)
             
-        finally:
-            # Close the Neo4j connection
-            await self._close()
+        return result
+    
+    def _get_cached_result(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        """Get a copy of a cached validation result if it is still fresh.
+        
+        Args:
+            key: Validation parameters the result was computed for
+            
+        Returns:
+            Cached validation results, or None if missing or expired
+        """
+        entry = self._result_cache.get(key)
+        if entry is None:
+            return None
+            
+        cached_at, result = entry
+        if time.monotonic() - cached_at >= self.result_cache_ttl:
+            del self._result_cache[key]
+            return None
+            
+        self._result_cache.move_to_end(key)
+        return copy.deepcopy(result)
+    
+    def _cache_result(self, key: Tuple, result: Dict[str, Any]) -> None:
+        """Cache a validation result, evicting the least recently used one when full.
+        
+        Args:
+            key: Validation parameters the result was computed for
+            result: Validation results
+        """
+        self._result_cache[key] = (time.monotonic(), copy.deepcopy(result))
+        self._result_cache.move_to_end(key)
+        while len(self._result_cache) > self.result_cache_size:
+            self._result_cache.popitem(last=False)
+    
+    def _build_result(self, validation_results: List[Dict[str, Any]], stats: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the response for a validation run.
+        
+        Args:
+            validation_results: Per-rule validation results
+            stats: Graph statistics
+            
+        Returns:
+            Validation results
+        """
+        return {
+            "operation_id": str(uuid.uuid4()),
+            "timestamp": datetime.now().isoformat(),
+            "validation_results": validation_results,
+            "total_issues": sum(r["issue_count"] for r in validation_results),
+            "total_fixed": sum(r.get("fix_count", 0) for r in validation_results),
+            "graph_statistics": stats
+        }
+    
+    async def _is_graph_empty(self) -> bool:
+        """Check whether the graph has no nodes, using the count store.
+        
+        Returns:
+            True if the graph has no nodes
+        """
+        counts = await self._run_transactional("MATCH (n) RETURN count(n) as count", keys=["count"])
+        return not counts or counts[0][0] == 0
+    
+    async def _run_rule(self, rule: Dict[str, Any], entity_types: List[str],
+                        relationship_types: List[str], include_labels: bool = True) -> Dict[str, Any]:
+        """Run a single validation rule.
+        
+        Args:
+            rule: Rule definition
+            entity_types: List of entity types to check
+            relationship_types: List of relationship types to check
+            include_labels: Whether issues should carry node labels
+            
+        Returns:
+            Validation results for the rule
+        """
+        logger.info(f"Running validation rule: {rule['name']}")
+        
+        return await self._VALIDATORS[rule["name"]](
+            self, entity_types, relationship_types, include_labels
+        )
     
     async def _connect(self) -> None:
         """Connect to Neo4j database."""
         if self.driver is None:
-            self.driver = AsyncGraphDatabase.driver(
-                self.neo4j_uri, 
-                auth=(self.neo4j_user, self.neo4j_password)
-            )
+            try:
+                self.driver = await get_driver(self.neo4j_config)
+                logger.info("Connected to Neo4j")
+            except Exception as e:
+                logger.error(f"Error connecting to Neo4j: {e}")
+                raise
             
-        # Test the connection
-        try:
-            async with self.driver.session() as session:
-                result = await session.run("RETURN 1 as num")
-                record = await result.single()
-                if record and record.get("num") == 1:
-                    logger.info("Connected to Neo4j")
-                else:
-                    raise Exception("Failed to verify Neo4j connection")
-        except Exception as e:
-            logger.error(f"Error connecting to Neo4j: {e}")
-            raise
+        if not self._indexes_ready:
+            await self._ensure_indexes()
+            self._indexes_ready = True
+    
+    async def _run_in_transactions(self, query: str, parameters: Dict[str, Any],
+                                   keys: List[str]) -> List[List[Any]]:
+        """Run a `CALL { ... } IN TRANSACTIONS` write query.
+        
+        The server commits the query in batches itself, which needs an
+        auto-commit transaction, so this cannot use a managed transaction.
+        
+        Args:
+            query: Cypher query
+            parameters: Query parameters
+            keys: Fields to return, in order
+            
+        Returns:
+            Result records as value lists
+        """
+        async with self.driver.session(database=self.neo4j_database, default_access_mode=WRITE_ACCESS) as session:
+            result = await session.run(query, parameters)
+            return await result.values(*keys)
+    
+    async def _ensure_indexes(self) -> None:
+        """Create the indexes the validators and fixes look up ids with."""
+        statements = [
+            # Same constraint as the graph builder; every entity has this label
+            "CREATE CONSTRAINT entity_id IF NOT EXISTS FOR (e:Entity) REQUIRE e.id IS UNIQUE",
+            "CREATE CONSTRAINT category_id IF NOT EXISTS FOR (c:Category) REQUIRE c.id IS UNIQUE"
+        ]
+        # Index names keep the label or type's case and mark relationship
+        # indexes, so no two of them can share a name
+        statements.extend(
+            f"CREATE INDEX {quote_name(label + '_id')} IF NOT EXISTS FOR (n:{quote_name(label)}) ON (n.id)"
+            for label in self.entity_labels if label != "Entity"
+        )
+        
+        # Relationship indexes need a type, so index the types the fixes delete by id
+        rel_types = {rel_type for pair in self.conflicting_pairs for rel_type in pair}
+        rel_types.update(self.hierarchical_rels)
+        statements.extend(
+            f"CREATE INDEX {quote_name('rel_' + rel_type + '_id')} IF NOT EXISTS "
+            f"FOR ()-[r:{quote_name(rel_type)}]-() ON (r.id)"
+            for rel_type in sorted(rel_types)
+        )
+        
+        async with self.driver.session(database=self.neo4j_database) as session:
+            for statement in statements:
+                try:
+                    result = await session.run(statement)
+                    await result.consume()
+                except Exception as e:
+                    logger.warning(f"Could not create index: {e}")
+    
+    async def _run_transactional(self, query: str, parameters: Optional[Dict[str, Any]] = None,
+                                 write: bool = False, keys: Optional[List[str]] = None) -> List[Any]:
+        """Run a query in a managed transaction.
+        
+        The driver retries managed transactions on transient errors and
+        routes read transactions to followers in a cluster.
+        
+        Args:
+            query: Cypher query
+            parameters: Query parameters
+            write: Whether the query writes to the graph
+            keys: Fields to return as value lists, in order, instead of dictionaries
+            
+        Returns:
+            Result records as dictionaries, or as value lists when `keys` is given
+        """
+        async def work(tx):
+            result = await tx.run(query, parameters or {})
+            if keys:
+                return await result.values(*keys)
+            return await result.data()
+            
+        access_mode = WRITE_ACCESS if write else READ_ACCESS
+        async with self.driver.session(database=self.neo4j_database, default_access_mode=access_mode) as session:
+            if write:
+                return await session.execute_write(work)
+            return await session.execute_read(work)
     
-    async def _close(self) -> None:
-        """Close the Neo4j connection."""
-        if self.driver:
-            await self.driver.close()
-            self.driver = None
+    async def aclose(self) -> None:
+        """Close the shared Neo4j driver.
+        
+        Only called when the owning agent shuts down.
+        """
+        self.driver = None
+        await close_driver()
     
-    async def _validate_orphaned_nodes(self, entity_types: List[str], relationship_types: List[str]) -> Dict[str, Any]:
+    async def _validate_orphaned_nodes(self, entity_types: List[str], relationship_types: List[str],
+                                       include_labels: bool = True) -> Dict[str, Any]:
         """Validate for orphaned nodes (nodes without relationships).
         
         Args:
             entity_types: List of entity types to check
             relationship_types: List of relationship types (unused for this validation)
+            include_labels: Whether issues should carry node labels
             
         Returns:
             Validation results
         """
-        issues = []
-        
-        async with self.driver.session() as session:
-            # Build the query based on entity types
-            if entity_types:
-                type_filter = " OR ".join([f"n:{entity_type}" for entity_type in entity_types])
-                query = f"MATCH (n) WHERE {type_filter} AND NOT (n)--() RETURN n.id as id, labels(n) as types, n.created_at as created_at"
-            else:
-                query = "MATCH (n) WHERE NOT (n)--() RETURN n.id as id, labels(n) as types, n.created_at as created_at"
-                
-            result = await session.run(query)
+        # The entity type filter is a parameter, so one plan serves every call.
+        # Only entities are checked, the nodes the fix can look up by id
+        query = (
+            f"MATCH (n:Entity) WHERE {_TYPE_FILTER} "
+            f"AND NOT exists {{ (n)-[r]-() WHERE type(r) <> '{NAME_SIMILAR_REL}' }} "
+            "RETURN n.id as id, n.created_at as created_at"
+            + (", labels(n) as types" if include_labels else "")
+        )
             
-            async for record in result:
-                issues.append({
-                    "id": record.get("id"),
-                    "types": record.get("types"),
-                    "created_at": record.get("created_at"),
+        if include_labels:
+            rows = await self._run_transactional(
+                query, {"entity_types": entity_types}, keys=["id", "created_at", "types"]
+            )
+            issues = [
+                {
+                    "id": node_id,
+                    "types": types,
+                    "created_at": created_at,
                     "issue": "Orphaned node without any relationships"
-                })
-                
+                }
+                for node_id, created_at, types in rows
+            ]
+        else:
+            rows = await self._run_transactional(
+                query, {"entity_types": entity_types}, keys=["id", "created_at"]
+            )
+            issues = [
+                {
+                    "id": node_id,
+                    "created_at": created_at,
+                    "issue": "Orphaned node without any relationships"
+                }
+                for node_id, created_at in rows
+            ]
+            
         return {
             "issues": issues
         }
@@ -204,93 +431,99 @@ class KnowledgeValidator:
         """
         fixed = []
         
-        async with self.driver.session() as session:
-            # Create an 'Unclassified' node if it doesn't exist
-            await session.run(
-                "MERGE (u:Category {id: 'unclassified'}) "
-                "ON CREATE SET u.name = 'Unclassified', u.created_at = datetime() "
-                "RETURN u.id"
+        # Create an 'Unclassified' node if it doesn't exist
+        await self._run_transactional(
+            "MERGE (u:Category {id: 'unclassified'}) "
+            "ON CREATE SET u.name = 'Unclassified', u.created_at = datetime() "
+            "RETURN u.id",
+            write=True
+        )
+        
+        # Connect all orphaned nodes to the unclassified node in one query,
+        # committed in batches
+        rows = [
+            {"node_id": issue["id"], "rel_id": str(uuid.uuid4())}
+            for issue in issues if issue.get("id")
+        ]
+        if not rows:
+            return {"fixed_count": 0, "fixed": fixed}
+            
+        try:
+            query = (
+                "UNWIND $rows AS row "
+                "CALL { "
+                "  WITH row "
+                "  MATCH (n:Entity {id: row.node_id}), (u:Category {id: 'unclassified'}) "
+                "  MERGE (n)-[r:BELONGS_TO {id: row.rel_id}]->(u) "
+                "  ON CREATE SET r.created_at = datetime(), r.automatic = true "
+                "  RETURN row.node_id as id "
+                f"}} IN TRANSACTIONS OF {self.fix_batch_size} ROWS "
+                "RETURN id"
             )
             
-            # Connect orphaned nodes to the unclassified node
-            for issue in issues:
-                node_id = issue.get("id")
-                if not node_id:
-                    continue
-                    
-                try:
-                    query = (
-                        "MATCH (n {id: $node_id}), (u:Category {id: 'unclassified'}) "
-                        "MERGE (n)-[r:BELONGS_TO {id: $rel_id}]->(u) "
-                        "ON CREATE SET r.created_at = datetime(), r.automatic = true "
-                        "RETURN r.id as id"
-                    )
-                    
-                    result = await session.run(
-                        query,
-                        {
-                            "node_id": node_id,
-                            "rel_id": str(uuid.uuid4())
-                        }
-                    )
-                    
-                    record = await result.single()
-                    if record:
-                        fixed.append({
-                            "node_id": node_id,
-                            "action": "Connected to Unclassified category"
-                        })
-                except Exception as e:
-                    logger.error(f"Error fixing orphaned node {node_id}: {e}")
-                
+            node_ids = await self._run_in_transactions(query, {"rows": rows}, keys=["id"])
+            
+            fixed = [
+                {
+                    "node_id": node_id,
+                    "action": "Connected to Unclassified category"
+                }
+                for node_id, in node_ids
+            ]
+        except Exception as e:
+            logger.error(f"Error fixing {len(rows)} orphaned nodes: {e}")
+            
         return {
             "fixed_count": len(fixed),
             "fixed": fixed
         }
     
-    async def _validate_conflicting_relationships(self, entity_types: List[str], relationship_types: List[str]) -> Dict[str, Any]:
+    async def _validate_conflicting_relationships(self, entity_types: List[str], relationship_types: List[str],
+                                                  include_labels: bool = True) -> Dict[str, Any]:
         """Validate for conflicting relationships.
         
         Args:
             entity_types: List of entity types to check
             relationship_types: List of relationship types to check
+            include_labels: Unused; conflict issues carry no labels
             
         Returns:
             Validation results
         """
-        issues = []
-        conflicting_pairs = [
-            ["IS_A", "PART_OF"],
-            ["CAUSE_EFFECT", "EFFECT_CAUSE"]
+        pairs = [
+            pair for pair in self.conflicting_pairs
+            if not relationship_types or any(rel_type in relationship_types for rel_type in pair)
         ]
-        
-        async with self.driver.session() as session:
-            for pair in conflicting_pairs:
-                if relationship_types and not any(rel_type in relationship_types for rel_type in pair):
-                    continue
-                    
-                rel1, rel2 = pair
-                
-                # Find nodes with conflicting relationships
-                query = (
-                    f"MATCH (a)-[r1:{rel1}]->(b) "
-                    f"MATCH (a)-[r2:{rel2}]->(b) "
-                    "RETURN a.id as from_id, b.id as to_id, r1.id as rel1_id, r2.id as rel2_id"
-                )
-                
-                result = await session.run(query)
-                
-                async for record in result:
-                    issues.append({
-                        "from_id": record.get("from_id"),
-                        "to_id": record.get("to_id"),
-                        "rel1_id": record.get("rel1_id"),
-                        "rel2_id": record.get("rel2_id"),
-                        "rel1_type": rel1,
-                        "rel2_type": rel2,
-                        "issue": f"Conflicting relationships: {rel1} and {rel2}"
-                    })
-                
+        if not pairs:
+            return {"issues": []}
+            
+        # Find nodes with conflicting relationships for every pair in one query
+        query = (
+            "UNWIND $pairs AS p "
+            "MATCH (a)-[r1]->(b) WHERE type(r1) = p[0] "
+            "MATCH (a)-[r2]->(b) WHERE type(r2) = p[1] "
+            "RETURN a.id as from_id, b.id as to_id, r1.id as rel1_id, r2.id as rel2_id, "
+            "p[0] as rel1_type, p[1] as rel2_type"
+        )
+        
+        rows = await self._run_transactional(
+            query, {"pairs": pairs},
+            keys=["from_id", "to_id", "rel1_id", "rel2_id", "rel1_type", "rel2_type"]
+        )
+        
+        issues = [
+            {
+                "from_id": from_id,
+                "to_id": to_id,
+                "rel1_id": rel1_id,
+                "rel2_id": rel2_id,
+                "rel1_type": rel1,
+                "rel2_type": rel2,
+                "issue": f"Conflicting relationships: {rel1} and {rel2}"
+            }
+            for from_id, to_id, rel1_id, rel2_id, rel1, rel2 in rows
+        ]
+            
         return {
             "issues": issues
         }
@@ -306,41 +539,41 @@ class KnowledgeValidator:
         """
         fixed = []
         
-        async with self.driver.session() as session:
-            for issue in issues:
-                rel2_id = issue.get("rel2_id")
-                if not rel2_id:
-                    continue
-                    
-                try:
-                    # Remove the second relationship
-                    query = "MATCH ()-[r {id: $rel_id}]->() DELETE r RETURN count(r) as deleted"
-                    
-                    result = await session.run(query, {"rel_id": rel2_id})
-                    record = await result.single()
-                    
-                    if record and record.get("deleted") > 0:
-                        fixed.append({
-                            "from_id": issue.get("from_id"),
-                            "to_id": issue.get("to_id"),
-                            "rel_id": rel2_id,
-                            "rel_type": issue.get("rel2_type"),
-                            "action": "Removed conflicting relationship"
-                        })
-                except Exception as e:
-                    logger.error(f"Error fixing conflicting relationship {rel2_id}: {e}")
-                
+        # Remove the second relationship of every conflicting pair in one query
+        rows = [issue for issue in issues if issue.get("rel2_id") and issue.get("rel2_type")]
+        if not rows:
+            return {"fixed_count": 0, "fixed": fixed}
+            
+        try:
+            deleted = await self._delete_relationships(
+                [(issue["rel2_type"], issue["rel2_id"]) for issue in rows]
+            )
+            
+            for issue in rows:
+                if issue["rel2_id"] in deleted:
+                    fixed.append({
+                        "from_id": issue.get("from_id"),
+                        "to_id": issue.get("to_id"),
+                        "rel_id": issue["rel2_id"],
+                        "rel_type": issue.get("rel2_type"),
+                        "action": "Removed conflicting relationship"
+                    })
+        except Exception as e:
+            logger.error(f"Error fixing {len(rows)} conflicting relationships: {e}")
+            
         return {
             "fixed_count": len(fixed),
             "fixed": fixed
         }
     
-    async def _validate_duplicate_entities(self, entity_types: List[str], relationship_types: List[str]) -> Dict[str, Any]:
+    async def _validate_duplicate_entities(self, entity_types: List[str], relationship_types: List[str],
+                                           include_labels: bool = True) -> Dict[str, Any]:
         """Validate for potentially duplicate entities.
         
         Args:
             entity_types: List of entity types to check
             relationship_types: List of relationship types (unused for this validation)
+            include_labels: Whether issues should carry node labels
             
         Returns:
             Validation results
@@ -351,38 +584,60 @@ class KnowledgeValidator:
         # In a real implementation, this would use more sophisticated techniques
         properties = ["name", "title", "label"]
         
-        async with self.driver.session() as session:
-            for prop in properties:
-                # Build query based on entity types
-                if entity_types:
-                    type_filter = " OR ".join([f"n1:{entity_type} AND n2:{entity_type}" for entity_type in entity_types])
-                    query = (
-                        f"MATCH (n1), (n2) "
-                        f"WHERE {type_filter} AND n1.id <> n2.id AND n1.{prop} = n2.{prop} AND n1.{prop} IS NOT NULL "
-                        f"RETURN n1.id as id1, n2.id as id2, labels(n1) as types1, labels(n2) as types2, n1.{prop} as prop_value"
+        labels_entry = ", labels: labels(n)" if include_labels else ""
+        
+        for prop in properties:
+            # Group nodes by property value in a single pass and pair up
+            # the members of each group, instead of a Cartesian product.
+            # With entity types, nodes only pair within a shared type;
+            # without, everything falls in a single null type group. Only
+            # entities are checked, the nodes the fix can look up by id.
+            query = (
+                f"MATCH (n:Entity) WHERE n.{prop} IS NOT NULL AND {_TYPE_FILTER} "
+                "UNWIND CASE WHEN size($entity_types) = 0 THEN [null] "
+                "ELSE [l IN labels(n) WHERE l IN $entity_types] END as t "
+                f"WITH t, n.{prop} as v, collect({{id: n.id{labels_entry}}}) as ns "
+                "WHERE size(ns) > 1 "
+                "UNWIND ns as a UNWIND ns as b "
+                "WITH a, b, v WHERE a.id < b.id "
+                "RETURN DISTINCT a.id as id1, b.id as id2, v as prop_value"
+                + (", a.labels as types1, b.labels as types2" if include_labels else "")
+            )
+                
+            try:
+                if include_labels:
+                    rows = await self._run_transactional(
+                        query, {"entity_types": entity_types},
+                        keys=["id1", "id2", "prop_value", "types1", "types2"]
+                    )
+                    issues.extend(
+                        {
+                            "id1": id1,
+                            "id2": id2,
+                            "types1": types1,
+                            "types2": types2,
+                            "property": prop,
+                            "value": value,
+                            "issue": f"Potential duplicate entities with same {prop}"
+                        }
+                        for id1, id2, value, types1, types2 in rows
                     )
                 else:
-                    query = (
-                        f"MATCH (n1), (n2) "
-                        f"WHERE n1.id <> n2.id AND n1.{prop} = n2.{prop} AND n1.{prop} IS NOT NULL "
-                        f"RETURN n1.id as id1, n2.id as id2, labels(n1) as types1, labels(n2) as types2, n1.{prop} as prop_value"
+                    rows = await self._run_transactional(
+                        query, {"entity_types": entity_types}, keys=["id1", "id2", "prop_value"]
                     )
-                    
-                try:
-                    result = await session.run(query)
-                    
-                    async for record in result:
-                        issues.append({
-                            "id1": record.get("id1"),
-                            "id2": record.get("id2"),
-                            "types1": record.get("types1"),
-                            "types2": record.get("types2"),
+                    issues.extend(
+                        {
+                            "id1": id1,
+                            "id2": id2,
                             "property": prop,
-                            "value": record.get("prop_value"),
+                            "value": value,
                             "issue": f"Potential duplicate entities with same {prop}"
-                        })
-                except Exception as e:
-                    logger.error(f"Error validating duplicate entities with property {prop}: {e}")
+                        }
+                        for id1, id2, value in rows
+                    )
+            except Exception as e:
+                logger.error(f"Error validating duplicate entities with property {prop}: {e}")
         
         return {
             "issues": issues
@@ -399,92 +654,90 @@ class KnowledgeValidator:
         """
         fixed = []
         
-        async with self.driver.session() as session:
-            for issue in issues:
-                id1 = issue.get("id1")
-                id2 = issue.get("id2")
+        pairs = [
+            {"id1": issue["id1"], "id2": issue["id2"]}
+            for issue in issues if issue.get("id1") and issue.get("id2")
+        ]
+        if not pairs:
+            return {"fixed_count": 0, "fixed": fixed}
+        
+        # Merge all pairs in one query, committed in batches. This is a simplified
+        # implementation that keeps the first entity, redirects the second
+        # entity's incoming and outgoing relationships to it and links the
+        # two with a DUPLICATE_OF relationship
+        query = (
+            "UNWIND $pairs AS p "
+            "CALL { "
+            "  WITH p "
+            "  MATCH (n1:Entity {id: p.id1}), (n2:Entity {id: p.id2}) "
+            "  CALL { "
+            "    WITH n1, n2 "
+            "    MATCH (n2)<-[r]-(other) "
+            f"    WHERE type(r) <> '{NAME_SIMILAR_REL}' "
+            "    AND NOT exists { (other)-[:SAME_TYPE_AS {id: r.id}]->(n1) } "
+            "    CREATE (other)-[r2:SAME_TYPE_AS {id: r.id}]->(n1) "
+            "    SET r2 = r "
+            "    WITH r "
+            "    DELETE r "
+            "    RETURN count(r) as incoming "
+            "  } "
+            "  CALL { "
+            "    WITH n1, n2 "
+            "    MATCH (n2)-[r]->(other) "
+            f"    WHERE type(r) <> '{NAME_SIMILAR_REL}' "
+            "    AND NOT exists { (n1)-[:SAME_TYPE_AS {id: r.id}]->(other) } "
+            "    CREATE (n1)-[r2:SAME_TYPE_AS {id: r.id}]->(other) "
+            "    SET r2 = r "
+            "    WITH r "
+            "    DELETE r "
+            "    RETURN count(r) as outgoing "
+            "  } "
+            "  MERGE (n2)-[d:DUPLICATE_OF]->(n1) "
+            "  ON CREATE SET d.created_at = datetime() "
+            "  RETURN p.id1 as id1, p.id2 as id2, incoming + outgoing as redirected, "
+            "  d IS NOT NULL as created "
+            f"}} IN TRANSACTIONS OF {self.fix_batch_size} ROWS "
+            "RETURN id1, id2, redirected, created"
+        )
+        
+        try:
+            rows = await self._run_in_transactions(
+                query, {"pairs": pairs}, keys=["id1", "id2", "redirected", "created"]
+            )
+            
+            for id1, id2, redirected, created in rows:
+                redirected = redirected or 0
+                created = created or False
                 
-                if not id1 or not id2:
-                    continue
-                    
-                try:
-                    # Merge the entities by redirecting relationships
-                    # This is a simplified implementation that keeps the first entity
-                    # and redirects relationships from the second entity
-                    
-                    # Redirect incoming relationships
-                    query1 = (
-                        "MATCH (n2 {id: $id2})<-[r]-(other) "
-                        "MATCH (n1 {id: $id1}) "
-                        "WHERE NOT (other)-[:SAME_TYPE_AS {id: r.id}]->(n1) "
-                        "CREATE (other)-[r2:SAME_TYPE_AS {id: r.id}]->(n1) "
-                        "SET r2 = r "
-                        "WITH r "
-                        "DELETE r "
-                        "RETURN count(r) as redirected"
-                    )
-                    
-                    # Redirect outgoing relationships
-                    query2 = (
-                        "MATCH (n2 {id: $id2})-[r]->(other) "
-                        "MATCH (n1 {id: $id1}) "
-                        "WHERE NOT (n1)-[:SAME_TYPE_AS {id: r.id}]->(other) "
-                        "CREATE (n1)-[r2:SAME_TYPE_AS {id: r.id}]->(other) "
-                        "SET r2 = r "
-                        "WITH r "
-                        "DELETE r "
-                        "RETURN count(r) as redirected"
-                    )
-                    
-                    # Add a "duplicate_of" relationship
-                    query3 = (
-                        "MATCH (n1 {id: $id1}), (n2 {id: $id2}) "
-                        "CREATE (n2)-[r:DUPLICATE_OF {created_at: datetime()}]->(n1) "
-                        "RETURN r IS NOT NULL as created"
-                    )
-                    
-                    # Execute the queries
-                    result1 = await session.run(query1, {"id1": id1, "id2": id2})
-                    record1 = await result1.single()
-                    
-                    result2 = await session.run(query2, {"id1": id1, "id2": id2})
-                    record2 = await result2.single()
-                    
-                    result3 = await session.run(query3, {"id1": id1, "id2": id2})
-                    record3 = await result3.single()
-                    
-                    redirected = (record1.get("redirected") or 0) + (record2.get("redirected") or 0)
-                    created = record3.get("created") or False
-                    
-                    if redirected > 0 or created:
-                        fixed.append({
-                            "id1": id1,
-                            "id2": id2,
-                            "redirected_relationships": redirected,
-                            "created_duplicate_rel": created,
-                            "action": "Merged duplicate entities"
-                        })
-                        
-                except Exception as e:
-                    logger.error(f"Error fixing duplicate entities {id1}, {id2}: {e}")
+                if redirected > 0 or created:
+                    fixed.append({
+                        "id1": id1,
+                        "id2": id2,
+                        "redirected_relationships": redirected,
+                        "created_duplicate_rel": created,
+                        "action": "Merged duplicate entities"
+                    })
+        except Exception as e:
+            logger.error(f"Error fixing {len(pairs)} duplicate entity pairs: {e}")
         
         return {
             "fixed_count": len(fixed),
             "fixed": fixed
         }
     
-    async def _validate_cycle_detection(self, entity_types: List[str], relationship_types: List[str]) -> Dict[str, Any]:
+    async def _validate_cycle_detection(self, entity_types: List[str], relationship_types: List[str],
+                                        include_labels: bool = True) -> Dict[str, Any]:
         """Validate for cycles in hierarchical relationships.
         
         Args:
             entity_types: List of entity types to check
             relationship_types: List of relationship types to check
+            include_labels: Unused; cycle issues carry no labels
             
         Returns:
             Validation results
         """
-        issues = []
-        hierarchical_rels = ["IS_A", "PART_OF"]
+        hierarchical_rels = self.hierarchical_rels
         
         # Filter relationship types if specified
         if relationship_types:
@@ -493,37 +746,38 @@ class KnowledgeValidator:
         if not hierarchical_rels:
             return {"issues": []}
             
-        async with self.driver.session() as session:
-            for rel_type in hierarchical_rels:
-                # Build query based on entity types
-                entity_filter = ""
-                if entity_types:
-                    type_filter = " OR ".join([f"n:{entity_type}" for entity_type in entity_types])
-                    entity_filter = f"WHERE {type_filter}"
-                    
-                # Find cycles in the hierarchy
-                query = (
-                    f"MATCH path = (n)-[:{rel_type}*2..10]->(n) {entity_filter} "
-                    "WITH nodes(path) as cycle_nodes, relationships(path) as cycle_rels "
-                    "RETURN [node.id for node in cycle_nodes] as node_ids, "
-                    "[rel.id for rel in cycle_rels] as rel_ids, "
-                    "length(cycle_nodes) as cycle_length"
-                )
-                
-                result = await session.run(query)
-                
-                async for record in result:
-                    node_ids = record.get("node_ids", [])
-                    rel_ids = record.get("rel_ids", [])
-                    cycle_length = record.get("cycle_length", 0)
-                    
-                    issues.append({
-                        "node_ids": node_ids,
-                        "relationship_ids": rel_ids,
-                        "relationship_type": rel_type,
-                        "cycle_length": cycle_length,
-                        "issue": f"Cycle detected in {rel_type} hierarchy with {cycle_length} nodes"
-                    })
+        # Find cycles for every hierarchical type in one query with a
+        # quantified path pattern, capped so dense regions cannot blow up
+        # the traversal. The types are a parameter, so the plan is reused,
+        # and a cycle only counts when all its relationships share a type.
+        query = (
+            "MATCH path = (n)(()-[r]->() WHERE type(r) IN $rel_types){2,10}(n) "
+            f"WHERE {_TYPE_FILTER} "
+            "WITH nodes(path) as cycle_nodes, relationships(path) as cycle_rels "
+            "WHERE all(rel IN cycle_rels WHERE type(rel) = type(cycle_rels[0])) "
+            "RETURN [node IN cycle_nodes | node.id] as node_ids, "
+            "[rel IN cycle_rels | rel.id] as rel_ids, "
+            "type(cycle_rels[0]) as rel_type, "
+            "size(cycle_rels) as cycle_length "
+            "LIMIT $max_cycles"
+        )
+        
+        rows = await self._run_transactional(
+            query,
+            {"entity_types": entity_types, "rel_types": hierarchical_rels, "max_cycles": self.max_cycles},
+            keys=["node_ids", "rel_ids", "rel_type", "cycle_length"]
+        )
+        
+        issues = [
+            {
+                "node_ids": node_ids or [],
+                "relationship_ids": rel_ids or [],
+                "relationship_type": rel_type,
+                "cycle_length": cycle_length or 0,
+                "issue": f"Cycle detected in {rel_type} hierarchy with {cycle_length} nodes"
+            }
+            for node_ids, rel_ids, rel_type, cycle_length in rows
+        ]
         
         return {
             "issues": issues
@@ -540,82 +794,146 @@ class KnowledgeValidator:
         """
         fixed = []
         
-        async with self.driver.session() as session:
-            for issue in issues:
-                rel_ids = issue.get("relationship_ids", [])
-                if not rel_ids:
-                    continue
-                    
-                # Remove the last relationship in the cycle to break it
-                rel_id_to_remove = rel_ids[-1]
-                
-                try:
-                    query = "MATCH ()-[r {id: $rel_id}]->() DELETE r RETURN count(r) as deleted"
-                    
-                    result = await session.run(query, {"rel_id": rel_id_to_remove})
-                    record = await result.single()
-                    
-                    if record and record.get("deleted") > 0:
-                        fixed.append({
-                            "relationship_id": rel_id_to_remove,
-                            "relationship_type": issue.get("relationship_type"),
-                            "cycle_length": issue.get("cycle_length"),
-                            "action": "Removed relationship to break cycle"
-                        })
-                except Exception as e:
-                    logger.error(f"Error fixing cycle by removing relationship {rel_id_to_remove}: {e}")
+        # Remove the last relationship of every cycle to break it, in one query
+        rows = [issue for issue in issues if issue.get("relationship_ids") and issue.get("relationship_type")]
+        if not rows:
+            return {"fixed_count": 0, "fixed": fixed}
+            
+        try:
+            deleted = await self._delete_relationships(
+                [(issue["relationship_type"], issue["relationship_ids"][-1]) for issue in rows]
+            )
+            
+            for issue in rows:
+                rel_id_to_remove = issue["relationship_ids"][-1]
+                if rel_id_to_remove in deleted:
+                    fixed.append({
+                        "relationship_id": rel_id_to_remove,
+                        "relationship_type": issue.get("relationship_type"),
+                        "cycle_length": issue.get("cycle_length"),
+                        "action": "Removed relationship to break cycle"
+                    })
+        except Exception as e:
+            logger.error(f"Error fixing {len(rows)} cycles: {e}")
         
         return {
             "fixed_count": len(fixed),
             "fixed": fixed
         }
     
+    async def _delete_relationships(self, relationships: List[Tuple[str, str]]) -> Set[str]:
+        """Delete relationships by id, one UNWIND query per relationship type.
+        
+        The type is part of the pattern so the lookup uses the type's id index.
+        Each query commits its deletes in batches.
+        
+        Args:
+            relationships: (relationship type, relationship id) pairs
+            
+        Returns:
+            Set of deleted relationship IDs
+        """
+        ids_by_type = {}
+        for rel_type, rel_id in relationships:
+            ids_by_type.setdefault(rel_type, []).append(rel_id)
+            
+        deleted = set()
+        for rel_type, rel_ids in ids_by_type.items():
+            query = (
+                "UNWIND $rel_ids AS rel_id "
+                "CALL { "
+                "  WITH rel_id "
+                f"  MATCH ()-[r:{quote_name(rel_type)} {{id: rel_id}}]->() "
+                "  DELETE r "
+                "  RETURN count(r) as removed "
+                f"}} IN TRANSACTIONS OF {self.fix_batch_size} ROWS "
+                "WITH rel_id WHERE removed > 0 "
+                "RETURN DISTINCT rel_id"
+            )
+            
+            rows = await self._run_in_transactions(query, {"rel_ids": rel_ids}, keys=["rel_id"])
+            deleted.update(rel_id for rel_id, in rows)
+            
+        return deleted
+    
+    async def _get_cached_statistics(self) -> Dict[str, Any]:
+        """Get graph statistics, recomputing them when the cached copy is
+        missing or older than `stats_ttl` seconds.
+        
+        Returns:
+            Dictionary of graph statistics
+        """
+        if self._stats_cache is None or time.monotonic() - self._stats_cache[0] >= self.stats_ttl:
+            self._stats_cache = (time.monotonic(), await self._get_graph_statistics())
+            
+        # Callers get a copy, so they cannot change the cached statistics
+        return copy.deepcopy(self._stats_cache[1])
+    
     async def _get_graph_statistics(self) -> Dict[str, Any]:
         """Get statistics about the knowledge graph.
         
+        Totals and the label and type names come back in one query; the
+        per-label and per-type counts in a second one. Every count matches
+        at most one label or type, so the planner answers it from the count
+        store instead of scanning.
+        
         Returns:
             Dictionary of graph statistics
         """
+        rows = await self._run_transactional(
+            "CALL { MATCH (n) RETURN count(n) as total_nodes } "
+            "CALL { MATCH ()-[r]->() RETURN count(r) as total_relationships } "
+            f"CALL {{ MATCH ()-[r:{NAME_SIMILAR_REL}]->() RETURN count(r) as view_relationships }} "
+            "CALL { CALL db.labels() YIELD label RETURN collect(label) as labels } "
+            "CALL { CALL db.relationshipTypes() YIELD relationshipType "
+            "RETURN collect(relationshipType) as rel_types } "
+            "RETURN total_nodes, total_relationships - view_relationships as total_relationships, labels, "
+            "[t IN rel_types WHERE t <> $similar_rel] as rel_types",
+            {"similar_rel": NAME_SIMILAR_REL},
+            keys=["total_nodes", "total_relationships", "labels", "rel_types"]
+        )
+        total_nodes, total_relationships, labels, rel_types = rows[0] if rows else (0, 0, [], [])
+        
         stats = {
-            "total_nodes": 0,
-            "total_relationships": 0,
+            "total_nodes": total_nodes,
+            "total_relationships": total_relationships,
             "node_types": {},
             "relationship_types": {}
         }
         
-        async with self.driver.session() as session:
-            # Count total nodes
-            result = await session.run("MATCH (n) RETURN count(n) as count")
-            record = await result.single()
-            if record:
-                stats["total_nodes"] = record.get("count")
-                
-            # Count total relationships
-            result = await session.run("MATCH ()-[r]->() RETURN count(r) as count")
-            record = await result.single()
-            if record:
-                stats["total_relationships"] = record.get("count")
-                
-            # Count nodes by type
-            result = await session.run(
-                "MATCH (n) "
-                "WITH labels(n) as labels "
-                "UNWIND labels as label "
-                "RETURN label, count(label) as count"
-            )
-            node_types = {}
-            async for record in result:
-                node_types[record.get("label")] = record.get("count")
-            stats["node_types"] = node_types
-            
-            # Count relationships by type
-            result = await session.run(
-                "MATCH ()-[r]->() "
-                "RETURN type(r) as type, count(r) as count"
-            )
-            rel_types = {}
-            async for record in result:
-                rel_types[record.get("type")] = record.get("count")
-            stats["relationship_types"] = rel_types
+        branches = [
+            f"MATCH (n:{quote_name(label)}) RETURN 'node' as kind, $labels[{index}] as name, count(n) as count"
+            for index, label in enumerate(labels)
+        ]
+        branches.extend(
+            f"MATCH ()-[r:{quote_name(rel_type)}]->() "
+            f"RETURN 'relationship' as kind, $rel_types[{index}] as name, count(r) as count"
+            for index, rel_type in enumerate(rel_types)
+        )
+        if not branches:
+            return stats
+            
+        rows = await self._run_transactional(
+            " UNION ALL ".join(branches),
+            {"labels": labels, "rel_types": rel_types},
+            keys=["kind", "name", "count"]
+        )
+        for kind, name, count in rows:
+            stats["node_types" if kind == "node" else "relationship_types"][name] = count
             
-        return stats 
\ No newline at end of file
+        return stats
+    
+    # Validation and fix function for each rule name, defined after the methods
+    # so they can refer to them
+    _VALIDATORS = {
+        "orphaned_nodes": _validate_orphaned_nodes,
+        "conflicting_relationships": _validate_conflicting_relationships,
+        "duplicate_entities": _validate_duplicate_entities,
+        "cycle_detection": _validate_cycle_detection
+    }
+    _FIXERS = {
+        "orphaned_nodes": _fix_orphaned_nodes,
+        "conflicting_relationships": _fix_conflicting_relationships,
+        "duplicate_entities": _fix_duplicate_entities,
+        "cycle_detection": _fix_cycle_detection
+    }
@@ -7,22 +7,150 @@ Relation extractor module for identifying relationships between entities.
 
 import logging
 import asyncio
-import time
+import multiprocessing
+import os
+import random
 import re
-from typing import Dict, List, Any, Optional, Tuple, Set
+import itertools
+from typing import Dict, List, Any, Optional, Tuple, Set, Iterator
 import uuid
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-import nltk
-from nltk.tokenize import sent_tokenize
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Download required NLTK resources
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt', quiet=True)
+# Characters of surrounding text kept as context on each side of a match
+_CONTEXT_CHARS = 100
+
+# Texts longer than this are scanned in parallel chunks of about
+# `_CHUNK_CHARS`, each scanned `_CHUNK_OVERLAP` characters past its end so
+# matches that start in the chunk can finish
+_PARALLEL_MIN_CHARS = 16384
+_CHUNK_CHARS = 8192
+_CHUNK_OVERLAP = 1024
+
+# Word characters at the end and at the start of a span
+_TRAILING_WORD_RE = re.compile(r"\w+$")
+_LEADING_WORD_RE = re.compile(r"\w+")
+
+
+def _phrase_trie_pattern(phrases: List[str]) -> str:
+    """Build a regex matching any of the phrases, sharing common word prefixes.
+    
+    The phrases are arranged in a word trie, so e.g. "is a" and "is part of"
+    share one "is" branch and the engine tests "is" only once.
+    Words may be separated by any whitespace.
+    
+    Args:
+        phrases: Phrases to match
+        
+    Returns:
+        Regex pattern (a non-capturing group)
+    """
+    trie: Dict[str, Any] = {}
+    for phrase in phrases:
+        node = trie
+        for word in phrase.lower().split():
+            node = node.setdefault(word, {})
+        node[""] = {}  # End of a phrase
+        
+    def to_pattern(node: Dict[str, Any]) -> str:
+        branches = []
+        for word in sorted(node):
+            if not word:
+                continue
+            child = node[word]
+            if not any(child):
+                branches.append(re.escape(word))
+            elif "" in child:
+                branches.append(f"{re.escape(word)}(?:\\s+{to_pattern(child)})?")
+            else:
+                branches.append(f"{re.escape(word)}\\s+{to_pattern(child)}")
+        return "(?:" + "|".join(branches) + ")"
+        
+    return to_pattern(trie)
+
+
+class _Relationship:
+    """A relationship found during extraction, converted to a dict for the response."""
+    
+    __slots__ = ("id", "type", "from_id", "to_id", "confidence", "source_text", "reason")
+    
+    def __init__(self, id: str, type: str, from_id: str, to_id: str, confidence: float,
+                 source_text: Optional[str] = None, reason: Optional[str] = None):
+        self.id = id
+        self.type = type
+        self.from_id = from_id
+        self.to_id = to_id
+        self.confidence = confidence
+        self.source_text = source_text
+        self.reason = reason
+        
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the relationship to its response dict.
+        
+        Returns:
+            Relationship dict, with the source text or the reason in its properties
+        """
+        properties: Dict[str, Any] = {"confidence": self.confidence}
+        if self.source_text is not None:
+            properties["source_text"] = self.source_text
+        if self.reason is not None:
+            properties["reason"] = self.reason
+            
+        return {
+            "id": self.id,
+            "type": self.type,
+            "from_id": self.from_id,
+            "to_id": self.to_id,
+            "properties": properties
+        }
+
+
+def _could_be_entity(word: str) -> bool:
+    """Check whether a word has the shape of an entity mention.
+    
+    Mentions are four or more ASCII letters, so any other word cannot
+    resolve to an entity, whatever its case.
+    
+    Args:
+        word: Word to check
+        
+    Returns:
+        True if the word may be an entity mention
+    """
+    return len(word) > 3 and word.isascii() and word.isalpha()
+
+
+# Extractor used by each chunk-scanning worker process
+_worker_extractor = None
+
+
+def _init_worker(config: Dict[str, Any]) -> None:
+    """Create the extractor a chunk-scanning worker process uses."""
+    global _worker_extractor
+    _worker_extractor = RelationExtractor(config)
+
+
+def _process_chunk(segment: str, start: int, end: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Extract entity and relationship mentions from one chunk of a text.
+    
+    Args:
+        segment: The chunk with the text around it
+        start: Offset of the chunk in the segment
+        end: Offset of the end of the chunk in the segment
+        
+    Returns:
+        Tuple of (entities, relationships)
+    """
+    return _worker_extractor._process_text(segment, start, end)
 
 
 class RelationExtractor:
@@ -36,47 +164,108 @@ class RelationExtractor:
         """
         self.config = config
         
-        # Define relationship patterns (simplified)
+        # Define relationship patterns (simplified); each relation is
+        # signalled by a verb phrase between two words
         # In a real implementation, these would be more sophisticated
         self.relation_patterns = [
             {
                 "name": "is_a",
-                "patterns": [
-                    r"(\w+)\s+is\s+a\s+(\w+)",
-                    r"(\w+)\s+are\s+(\w+)",
-                    r"(\w+)\s+as\s+a\s+(\w+)"
-                ],
+                "phrases": ["is a", "are", "as a"],
                 "symmetric": False
             },
             {
                 "name": "part_of",
-                "patterns": [
-                    r"(\w+)\s+is\s+part\s+of\s+(\w+)",
-                    r"(\w+)\s+belongs\s+to\s+(\w+)",
-                    r"(\w+)\s+consists\s+of\s+(\w+)"
-                ],
+                "phrases": ["is part of", "belongs to", "consists of"],
                 "symmetric": False
             },
             {
                 "name": "related_to",
-                "patterns": [
-                    r"(\w+)\s+relates\s+to\s+(\w+)",
-                    r"(\w+)\s+is\s+related\s+to\s+(\w+)",
-                    r"(\w+)\s+connects\s+with\s+(\w+)"
-                ],
+                "phrases": ["relates to", "is related to", "connects with"],
                 "symmetric": True
             },
             {
                 "name": "cause_effect",
-                "patterns": [
-                    r"(\w+)\s+causes\s+(\w+)",
-                    r"(\w+)\s+leads\s+to\s+(\w+)",
-                    r"(\w+)\s+results\s+in\s+(\w+)"
-                ],
+                "phrases": ["causes", "leads to", "results in"],
                 "symmetric": False
             }
         ]
         
+        # Check the relation definitions once here rather than guarding each
+        # match. Phrases are looked up lowercase and single-spaced.
+        for relation in self.relation_patterns:
+            if not relation.get("name") or not relation.get("phrases") or "symmetric" not in relation:
+                raise ValueError(f"Invalid relation pattern: {relation}")
+            for phrase in relation["phrases"]:
+                if not phrase or phrase != " ".join(phrase.lower().split()):
+                    raise ValueError(f"Invalid phrase in relation pattern {relation['name']}: {phrase!r}")
+        
+        # Known subtypes of each entity type
+        self.entity_hierarchy = {
+            "Person": ["Author", "Scientist", "Artist"],
+            "Location": ["City", "Country", "Landmark"],
+            "Organization": ["Company", "University", "Government"]
+        }
+        self._child_to_parent = {
+            child_type: parent_type
+            for parent_type, child_types in self.entity_hierarchy.items()
+            for child_type in child_types
+        }
+        
+        # Relationships inferred between two entities depend only on their
+        # types, so the templates for each ordered pair of types are worked
+        # out once. The known types are filled in here and others on first use.
+        self._pair_table: Dict[Tuple[str, str], List[Tuple[str, float, str, bool]]] = {}
+        known_types = ["Entity", *self.entity_hierarchy, *self._child_to_parent]
+        for type1 in known_types:
+            for type2 in known_types:
+                self._pair_templates(type1, type2)
+        
+        # Scan the text once with a single pattern: a word, any of the verb
+        # phrases (compiled as a trie) and another word. The captured phrase
+        # identifies the relation. Only the first word is consumed and the
+        # rest is looked ahead at, so every word can start a match and each
+        # match depends only on the text around it. The phrases are all
+        # lowercase, so the pattern is matched against a lowercased copy of
+        # the text rather than with IGNORECASE.
+        self._relation_by_phrase = {
+            phrase: relation
+            for relation in self.relation_patterns
+            for phrase in relation["phrases"]
+        }
+        relation_pattern = (
+            rf"(\w+)(?=\s+({_phrase_trie_pattern(list(self._relation_by_phrase))})\s+(\w+))"
+        )
+        self._relation_pattern = re.compile(relation_pattern)
+        self._relation_pattern_ignorecase = re.compile(relation_pattern, re.IGNORECASE)
+        if self._relation_pattern.groups != 3:
+            raise ValueError("Relation pattern must capture the two words and the phrase")
+        
+        # With pyahocorasick installed, find the phrases with an Aho-Corasick
+        # automaton instead, which finds every phrase in one linear pass
+        # however many phrases there are
+        if ahocorasick is not None:
+            self._phrase_automaton = ahocorasick.Automaton()
+            for phrase, relation in self._relation_by_phrase.items():
+                key = " ".join(phrase.lower().split())
+                self._phrase_automaton.add_word(key, (relation, len(key)))
+            self._phrase_automaton.make_automaton()
+            self._find_relations = self._find_relations_automaton
+        else:
+            self._find_relations = self._find_relations_regex
+        
+        # Worker processes for scanning long texts, started on first use
+        self.max_workers = config.get('relation_extraction', {}).get('max_workers')
+        self._executor: Optional[ProcessPoolExecutor] = None
+        
+        # Operation ids only need to be unique, not unpredictable, so they
+        # come from a generator seeded once rather than from os.urandom
+        self._id_random = random.Random(os.urandom(16))
+        
+        # Capitalized words of four letters or more are treated as potential
+        # entities, except at the start of the text or of a sentence (keep in
+        # step with `_could_be_entity`)
+        self._entity_pattern = re.compile(r"(?<=\s)(?<![.!?]\s)([A-Z][A-Za-z]{3,})\b")
+        
         logger.info("Relation extractor initialized")
     
     async def extract(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -98,9 +287,15 @@ class RelationExtractor:
             
         logger.info("Extracting relationships")
         
+        # Ids within the operation are its UUID plus a running number, so
+        # only one UUID is generated per operation
+        operation_id = uuid.UUID(int=self._id_random.getrandbits(128), version=4)
+        op_prefix = operation_id.hex
+        counter = itertools.count()
+        
         # Prepare result structure
         result = {
-            "operation_id": str(uuid.uuid4()),
+            "operation_id": str(operation_id),
             "timestamp": datetime.now().isoformat(),
             "source_id": source_id
         }
@@ -108,92 +303,192 @@ class RelationExtractor:
         # Process based on input type
         if text:
             # Extract entities and relationships from text
-            extracted_entities, relationships = await self._extract_from_text(text)
+            extracted_entities, relationships = await self._extract_from_text(text, op_prefix, counter)
             
             result["extracted_entities"] = extracted_entities
-            result["relationships"] = relationships
+            result["relationships"] = [relationship.to_dict() for relationship in relationships]
             result["entity_count"] = len(extracted_entities)
             result["relationship_count"] = len(relationships)
             
         elif entities and entity_ids:
             # Analyze relationships between provided entities
-            relationships = await self._analyze_entity_relationships(entities, entity_ids)
+            relationships = await self._analyze_entity_relationships(
+                entities, entity_ids, op_prefix, counter
+            )
             
-            result["relationships"] = relationships
+            result["relationships"] = [relationship.to_dict() for relationship in relationships]
             result["relationship_count"] = len(relationships)
             
         return result
     
-    async def _extract_from_text(self, text: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    async def _extract_from_text(self, text: str, op_prefix: str,
+                                 counter: Iterator[int]) -> Tuple[List[Dict[str, Any]], List[_Relationship]]:
         """Extract entities and relationships from text.
         
         Args:
             text: Text to analyze
+            op_prefix: Prefix of the ids generated in this operation
+            counter: Running number for the ids generated in this operation
             
         Returns:
             Tuple of (entities, relationships)
         """
-        # Tokenize text into sentences
-        sentences = sent_tokenize(text)
+        # Collapse whitespace runs so phrases are always single-spaced
+        text = " ".join(text.split())
         
-        # Track extracted entities and relationships
-        entities: Dict[str, Dict[str, Any]] = {}  # Using dict for deduplication
-        relationships: List[Dict[str, Any]] = []
+        # Extract potential entities and relationships from the whole text
+        # in one pass each, rather than sentence by sentence
+        if len(text) > _PARALLEL_MIN_CHARS:
+            text_entities, text_relationships = await self._process_text_parallel(text)
+        else:
+            text_entities, text_relationships = self._process_text(text)
         
-        # Process each sentence
-        for sentence in sentences:
-            # Extract potential entities and relationships from the sentence
-            sentence_entities, sentence_relationships = self._process_sentence(sentence)
-            
-            # Add entities (deduplicating by mention)
-            for entity in sentence_entities:
-                mention = entity["mention"].lower()
-                if mention not in entities:
-                    entity_id = str(uuid.uuid4())
-                    entities[mention] = {
-                        "id": entity_id,
-                        "type": entity["type"],
-                        "mention": entity["mention"],
-                        "properties": {
-                            "source_text": entity["context"]
-                        }
-                    }
+        # Track extracted entities column by column, with the index of each
+        # lowercased mention for deduplication
+        mention_to_idx: Dict[str, int] = {}
+        ids: List[str] = []
+        types: List[str] = []
+        mentions: List[str] = []
+        contexts: List[str] = []
+        relationships: List[_Relationship] = []
+        
+        # Entity ids by the exact spelling of a word (None if the word is not
+        # an entity), so each spelling is only lowercased once
+        by_spelling: Dict[str, Optional[str]] = {}
+        
+        # Add entities (deduplicating by lowercased mention)
+        for entity in text_entities:
+            spelling = entity["mention"]
+            if spelling in by_spelling:
+                continue
+                
+            # A new mention gets the next index, with one dict lookup
+            idx = mention_to_idx.setdefault(spelling.lower(), len(ids))
+            if idx == len(ids):
+                ids.append(f"{op_prefix}-{next(counter)}")
+                types.append(entity["type"])
+                mentions.append(spelling)
+                contexts.append(entity["context"])
+            by_spelling[spelling] = ids[idx]
+        
+        # Add relationships
+        for relationship in text_relationships:
+            from_spelling = relationship["from_entity"]
+            if from_spelling not in by_spelling:
+                idx = mention_to_idx.get(from_spelling.lower())
+                by_spelling[from_spelling] = None if idx is None else ids[idx]
+            to_spelling = relationship["to_entity"]
+            if to_spelling not in by_spelling:
+                idx = mention_to_idx.get(to_spelling.lower())
+                by_spelling[to_spelling] = None if idx is None else ids[idx]
+            from_id = by_spelling[from_spelling]
+            to_id = by_spelling[to_spelling]
             
-            # Add relationships
-            for relationship in sentence_relationships:
-                from_entity = relationship["from_entity"].lower()
-                to_entity = relationship["to_entity"].lower()
+            # Skip if either entity is not recognized
+            if from_id is None or to_id is None:
+                continue
                 
-                # Skip if either entity is not recognized
-                if from_entity not in entities or to_entity not in entities:
-                    continue
-                    
-                # Create relationship
-                relationships.append({
-                    "id": str(uuid.uuid4()),
-                    "type": relationship["type"],
-                    "from_id": entities[from_entity]["id"],
-                    "to_id": entities[to_entity]["id"],
-                    "properties": {
-                        "confidence": relationship["confidence"],
-                        "source_text": relationship["context"]
-                    }
-                })
+            # Create relationship
+            relationships.append(_Relationship(
+                f"{op_prefix}-{next(counter)}",
+                relationship["type"],
+                from_id,
+                to_id,
+                relationship["confidence"],
+                source_text=relationship["context"]
+            ))
+            
+        # Build the entity dicts for the response
+        entities = [
+            {
+                "id": entity_id,
+                "type": entity_type,
+                "mention": mention,
+                "properties": {
+                    "source_text": context
+                }
+            }
+            for entity_id, entity_type, mention, context in zip(ids, types, mentions, contexts)
+        ]
+        
+        return entities, relationships
+    
+    async def _process_text_parallel(self, text: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Process a long text in chunks on worker processes.
+        
+        Chunks end at spaces so no word is split. Each match belongs to the
+        chunk it starts in, so matches found again in the next chunk's
+        overlap are not duplicated, and the results come back in text order.
+        
+        Args:
+            text: Single-spaced text to process
+            
+        Returns:
+            Tuple of (entities, relationships)
+        """
+        if self._executor is None:
+            # Forking would copy the running event loop and any held locks
+            # into the workers, so start them from a fresh interpreter
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.config,)
+            )
+            
+        loop = asyncio.get_running_loop()
+        futures = []
+        start = 0
+        while start < len(text):
+            end = text.find(" ", start + _CHUNK_CHARS)
+            if end == -1:
+                end = len(text)
                 
-            # Simulate processing time
-            await asyncio.sleep(0.01)
+            # Send the context before the chunk and the overlap after it too
+            segment_start = max(0, start - _CONTEXT_CHARS)
+            futures.append(loop.run_in_executor(
+                self._executor, _process_chunk,
+                text[segment_start:end + _CHUNK_OVERLAP], start - segment_start, end - segment_start
+            ))
+            start = end
+            
+        entities = []
+        relationships = []
+        for chunk_entities, chunk_relationships in await asyncio.gather(*futures):
+            entities.extend(chunk_entities)
+            relationships.extend(chunk_relationships)
             
-        return list(entities.values()), relationships
+        return entities, relationships
+    
+    def close(self) -> None:
+        """Shut down the chunk-scanning worker processes, if started.
+        
+        Called from the agent's event loop, so it does not wait for
+        running chunk scans; queued ones are cancelled.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
     
-    def _process_sentence(self, sentence: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
-        """Process a sentence to extract entities and relationships.
+    def _process_text(self, text: str, start: int = 0,
+                      end: Optional[int] = None) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Process a text to extract entities and relationships.
+        
+        Each match keeps the text around it, up to `_CONTEXT_CHARS` on each
+        side, as its context. Only the first mention of each spelling is
+        returned, as later ones would be deduplicated anyway.
         
         Args:
-            sentence: Sentence to process
+            text: Text to process
+            start: Offset to start scanning at
+            end: Only keep matches starting before this offset (default: end of text)
             
         Returns:
             Tuple of (entities, relationships)
         """
+        if end is None:
+            end = len(text)
+            
         # This is a simplified implementation
         # In a real system, this would use more sophisticated NLP techniques
         
@@ -202,57 +497,117 @@ class RelationExtractor:
         
         # Extract entities (simplified approach using capitalized words as potential entities)
         # In a real implementation, this would use named entity recognition
-        words = sentence.split()
-        for word in words:
-            # Simple heuristic: capitalized words that aren't at the start of a sentence
-            if word != words[0] and word[0].isupper() and len(word) > 3:
-                entities.append({
-                    "mention": word,
-                    "type": "Concept",  # Simplified entity typing
-                    "context": sentence
-                })
-        
-        # Extract relationships using patterns
-        for relation in self.relation_patterns:
-            relation_type = relation["name"]
-            
-            for pattern in relation["patterns"]:
-                matches = re.finditer(pattern, sentence, re.IGNORECASE)
-                
-                for match in matches:
-                    try:
-                        from_entity = match.group(1)
-                        to_entity = match.group(2)
-                        
-                        # Add the relationship
-                        relationships.append({
-                            "from_entity": from_entity,
-                            "to_entity": to_entity,
-                            "type": relation_type.upper(),
-                            "confidence": 0.7,  # Simplified confidence score
-                            "context": sentence
-                        })
-                        
-                        # If the relationship is symmetric, add the reverse relationship
-                        if relation["symmetric"]:
-                            relationships.append({
-                                "from_entity": to_entity,
-                                "to_entity": from_entity,
-                                "type": relation_type.upper(),
-                                "confidence": 0.7,  # Simplified confidence score
-                                "context": sentence
-                            })
-                    except Exception as e:
-                        logger.warning(f"Error processing match: {e}")
+        seen_mentions: Set[str] = set()
+        for match in self._entity_pattern.finditer(text, start):
+            if match.start() >= end:
+                break
+            mention = match.group(1)
+            if mention in seen_mentions:
+                continue
+            seen_mentions.add(mention)
+            entities.append({
+                "mention": mention,
+                "type": "Concept",  # Simplified entity typing
+                "context": text[max(0, match.start() - _CONTEXT_CHARS):match.end() + _CONTEXT_CHARS]
+            })
+        
+        # Extract relationships from the verb phrases found in the text,
+        # skipping those that could not be resolved to entities
+        matches = [
+            (from_entity, relation, to_entity,
+             text[max(0, match_start - _CONTEXT_CHARS):match_end + _CONTEXT_CHARS])
+            for from_entity, relation, to_entity, match_start, match_end in itertools.takewhile(
+                lambda found: found[3] < end, self._find_relations(text, start)
+            )
+            if _could_be_entity(from_entity) and _could_be_entity(to_entity)
+        ]
+        
+        # Add the relationships, each symmetric one followed by its reverse
+        relationships.extend(
+            {
+                "from_entity": word1,
+                "to_entity": word2,
+                "type": relation["name"].upper(),
+                "confidence": 0.7,  # Simplified confidence score
+                "context": context
+            }
+            for from_entity, relation, to_entity, context in matches
+            for word1, word2 in (
+                ((from_entity, to_entity), (to_entity, from_entity)) if relation["symmetric"]
+                else ((from_entity, to_entity),)
+            )
+        )
         
         return entities, relationships
     
-    async def _analyze_entity_relationships(self, entities: List[Dict[str, Any]], entity_ids: List[str]) -> List[Dict[str, Any]]:
+    def _find_relations_regex(self, text: str, start: int = 0) -> Iterator[Tuple[str, Dict[str, Any], str, int, int]]:
+        """Find relation phrases and the words around them with the phrase regex.
+        
+        The words are taken from the original text, so they keep their case.
+        
+        Args:
+            text: Text to scan
+            start: Offset to start scanning at
+            
+        Yields:
+            Tuples of (from word, relation, to word, start offset, end offset)
+        """
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            pattern, scanned = self._relation_pattern, lowered
+        else:
+            # Lowercasing changed some offsets, so match the text itself
+            pattern, scanned = self._relation_pattern_ignorecase, text
+            
+        relation_by_phrase = self._relation_by_phrase
+        for match in pattern.finditer(scanned, start):
+            relation = relation_by_phrase[" ".join(match.group(2).lower().split())]
+            yield (text[match.start(1):match.end(1)], relation, text[match.start(3):match.end(3)],
+                   match.start(), match.end(3))
+    
+    def _find_relations_automaton(self, text: str, start: int = 0) -> Iterator[Tuple[str, Dict[str, Any], str, int, int]]:
+        """Find relation phrases with the Aho-Corasick automaton.
+        
+        A phrase counts when it is a separate run of words with a word on
+        each side, as in the regex. The text must be single-spaced.
+        
+        Args:
+            text: Text to scan
+            start: Offset to start scanning at
+            
+        Yields:
+            Tuples of (from word, relation, to word, start offset, end offset)
+        """
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # Lowercasing changed some offsets, so they cannot be mapped back
+            yield from self._find_relations_regex(text, start)
+            return
+            
+        length = len(lowered)
+        for last, (relation, phrase_length) in self._phrase_automaton.iter(lowered, start):
+            phrase_start = last - phrase_length + 1
+            
+            # The phrase must be surrounded by spaces
+            if (phrase_start < 2 or last + 2 >= length
+                    or lowered[phrase_start - 1] != " " or lowered[last + 1] != " "):
+                continue
+                
+            left_start = lowered.rfind(" ", 0, phrase_start - 1) + 1
+            left = _TRAILING_WORD_RE.search(text, left_start, phrase_start - 1)
+            right = _LEADING_WORD_RE.match(text, last + 2)
+            if left and right and left.start() >= start:
+                yield left.group(), relation, right.group(), left.start(), right.end()
+    
+    async def _analyze_entity_relationships(self, entities: List[Dict[str, Any]], entity_ids: List[str],
+                                            op_prefix: str, counter: Iterator[int]) -> List[_Relationship]:
         """Analyze relationships between provided entities.
         
         Args:
             entities: List of entities
             entity_ids: List of entity IDs
+            op_prefix: Prefix of the ids generated in this operation
+            counter: Running number for the ids generated in this operation
             
         Returns:
             List of relationships
@@ -263,32 +618,78 @@ class RelationExtractor:
         relationships = []
         entity_map = {entity.get('id'): entity for entity in entities if entity.get('id')}
         
-        # Find potential relationships based on entity properties
-        for i, entity_id1 in enumerate(entity_ids):
-            for entity_id2 in entity_ids[i+1:]:
-                entity1 = entity_map.get(entity_id1)
-                entity2 = entity_map.get(entity_id2)
-                
-                if not entity1 or not entity2:
-                    continue
+        # Relationships are only inferred from entity types, so bucket the
+        # entities by type and only pair up buckets that can be related
+        # instead of comparing every pair of entities
+        by_type: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for entity_id in entity_ids:
+            entity = entity_map.get(entity_id)
+            if entity:
+                by_type[entity.get('type', 'Entity')].append(entity)
+        
+        # Entities of the same type
+        for bucket in by_type.values():
+            for i, entity1 in enumerate(bucket):
+                for entity2 in bucket[i+1:]:
+                    relationships.extend(self._infer_relationships(entity1, entity2, op_prefix, counter))
                     
-                # Analyze potential relationship
-                potential_relationships = self._infer_relationships(entity1, entity2)
-                
-                # Add to results
-                relationships.extend(potential_relationships)
+                # Yield to the event loop now and then on long entity lists
+                if i & 1023 == 1023:
+                    await asyncio.sleep(0)
+        
+        # Entities whose types are a parent type and one of its subtypes
+        for parent_type, child_types in self.entity_hierarchy.items():
+            parents = by_type.get(parent_type)
+            if not parents:
+                continue
                 
-            # Simulate processing time
-            await asyncio.sleep(0.01)
+            for child_type in child_types:
+                for child in by_type.get(child_type, []):
+                    for parent in parents:
+                        relationships.extend(self._infer_relationships(parent, child, op_prefix, counter))
             
         return relationships
     
-    def _infer_relationships(self, entity1: Dict[str, Any], entity2: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _pair_templates(self, type1: str, type2: str) -> List[Tuple[str, float, str, bool]]:
+        """Get the relationship templates for an ordered pair of entity types.
+        
+        Args:
+            type1: Type of the first entity
+            type2: Type of the second entity
+            
+        Returns:
+            List of (relationship type, confidence, reason, reversed) templates,
+            where reversed means the relationship goes from the second entity
+            to the first
+        """
+        templates = self._pair_table.get((type1, type2))
+        if templates is not None:
+            return templates
+            
+        templates = []
+        
+        # Simple heuristic: if entities have the same type, they might be related
+        if type1 == type2:
+            templates.append(("RELATED_TO", 0.5, f"Both entities are of type {type1}", False))
+        
+        # If one entity type is a known subtype of another, create an IS_A relationship
+        if self._child_to_parent.get(type2) == type1:
+            templates.append(("IS_A", 0.8, f"{type2} is a {type1}", True))
+        elif self._child_to_parent.get(type1) == type2:
+            templates.append(("IS_A", 0.8, f"{type1} is a {type2}", False))
+            
+        self._pair_table[(type1, type2)] = templates
+        return templates
+    
+    def _infer_relationships(self, entity1: Dict[str, Any], entity2: Dict[str, Any],
+                             op_prefix: str, counter: Iterator[int]) -> List[_Relationship]:
         """Infer potential relationships between two entities.
         
         Args:
             entity1: First entity
             entity2: Second entity
+            op_prefix: Prefix of the ids generated in this operation
+            counter: Running number for the ids generated in this operation
             
         Returns:
             List of potential relationships
@@ -296,52 +697,16 @@ class RelationExtractor:
         # This is a simplified implementation
         # In a real system, this would use more sophisticated methods
         
-        relationships = []
-        entity1_type = entity1.get('type', 'Entity')
-        entity2_type = entity2.get('type', 'Entity')
-        
-        # Simple heuristic: if entities have the same type, they might be related
-        if entity1_type == entity2_type:
-            relationships.append({
-                "id": str(uuid.uuid4()),
-                "type": "RELATED_TO",
-                "from_id": entity1['id'],
-                "to_id": entity2['id'],
-                "properties": {
-                    "confidence": 0.5,
-                    "reason": f"Both entities are of type {entity1_type}"
-                }
-            })
-        
-        # If one entity type is a known subtype of another, create an IS_A relationship
-        entity_hierarchy = {
-            "Person": ["Author", "Scientist", "Artist"],
-            "Location": ["City", "Country", "Landmark"],
-            "Organization": ["Company", "University", "Government"]
-        }
+        templates = self._pair_templates(entity1.get('type', 'Entity'), entity2.get('type', 'Entity'))
         
-        for parent_type, child_types in entity_hierarchy.items():
-            if entity1_type == parent_type and entity2_type in child_types:
-                relationships.append({
-                    "id": str(uuid.uuid4()),
-                    "type": "IS_A",
-                    "from_id": entity2['id'],
-                    "to_id": entity1['id'],
-                    "properties": {
-                        "confidence": 0.8,
-                        "reason": f"{entity2_type} is a {entity1_type}"
-                    }
-                })
-            elif entity2_type == parent_type and entity1_type in child_types:
-                relationships.append({
-                    "id": str(uuid.uuid4()),
-                    "type": "IS_A",
-                    "from_id": entity1['id'],
-                    "to_id": entity2['id'],
-                    "properties": {
-                        "confidence": 0.8,
-                        "reason": f"{entity1_type} is a {entity2_type}"
-                    }
-                })
-        
-        return relationships 
\ No newline at end of file
+        return [
+            _Relationship(
+                f"{op_prefix}-{next(counter)}",
+                relationship_type,
+                entity2['id'] if reverse else entity1['id'],
+                entity1['id'] if reverse else entity2['id'],
+                confidence,
+                reason=reason
+            )
+            for relationship_type, confidence, reason, reverse in templates
+        ]
\ No newline at end of file
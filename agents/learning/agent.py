@@ -23,7 +23,7 @@ from coordinator.utils import setup_logging
 from coordinator.message_broker import MessageBroker
 
 # Import specific learning modules
-from agents.learning.feedback_analyzer import FeedbackAnalyzer
+from agents.learning.feedback_analyzer import FeedbackAnalyzer, close_client
 from agents.learning.model_trainer import ModelTrainer
 from agents.learning.knowledge_enhancer import KnowledgeEnhancer
 
@@ -101,6 +101,10 @@ class LearningAgent:
         # Close message broker connection
         await self.message_broker.close()
         
+        # Close the shared MongoDB connection pool and Neo4j driver
+        close_client()
+        await self.knowledge_enhancer.aclose()
+        
         self.is_running = False
         logger.info(f"Learning agent {self.agent_id} stopped")
     
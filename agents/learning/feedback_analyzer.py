@@ -8,19 +8,130 @@ Feedback analyzer module for analyzing user feedback and interactions.
 import logging
 import asyncio
 import time
-from typing import Dict, List, Any, Optional
+import copy
+import re
+import warnings
+from typing import Dict, List, Any, Optional, Tuple
 import json
 import uuid
-from datetime import datetime
-from pymongo import MongoClient
+from collections import Counter, OrderedDict, defaultdict
+from datetime import datetime, timezone
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import IndexModel
+from pymongo.errors import BulkWriteError
+
+try:
+    import ahocorasick
+except ImportError:  # Optional; keywords are then found one at a time
+    ahocorasick = None
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Keywords for the simple keyword-based sentiment and topic analysis
+# In a real implementation, this would use more sophisticated methods
+_POSITIVE_WORDS = ['good', 'great', 'excellent', 'helpful', 'useful', 'amazing', 'love']
+_NEGATIVE_WORDS = ['bad', 'poor', 'terrible', 'unhelpful', 'useless', 'awful', 'hate']
+_TOPIC_KEYWORDS = {
+    "interface": ["ui", "interface", "design", "layout", "button", "menu"],
+    "performance": ["speed", "fast", "slow", "performance", "loading"],
+    "accuracy": ["accurate", "correct", "wrong", "accuracy", "error"],
+    "content": ["information", "content", "article", "text", "data"],
+    "search": ["search", "find", "query", "results"],
+    "recommendations": ["recommend", "suggestion", "similar"]
+}
+
+# Words marking an insight as negative
+_NEGATIVE_INSIGHT_RE = re.compile(r"negative|poor|bad", re.IGNORECASE)
+
+# Sentiment of a stored feedback item that can be worked out without its
+# content, as in `FeedbackAnalyzer._determine_sentiment` (null otherwise)
+_SENTIMENT_EXPR = {
+    "$switch": {
+        "branches": [
+            {"case": {"$ne": [{"$type": "$sentiment"}, "missing"]}, "then": "$sentiment"},
+            {
+                "case": {"$and": [{"$eq": ["$type", "rating"]}, {"$ne": [{"$ifNull": ["$value", None]}, None]}]},
+                "then": {
+                    "$switch": {
+                        "branches": [
+                            {"case": {"$gt": ["$value", 3]}, "then": "positive"},
+                            {"case": {"$lt": ["$value", 3]}, "then": "negative"}
+                        ],
+                        "default": "neutral"
+                    }
+                }
+            },
+            {"case": {"$eq": ["$type", "like"]}, "then": "positive"},
+            {"case": {"$eq": ["$type", "dislike"]}, "then": "negative"}
+        ],
+        "default": None
+    }
+}
+
+# Whether the content of a stored feedback item mentions each topic, as
+# found by `FeedbackAnalyzer._scan_content`
+_TOPIC_MATCH_EXPRS = {
+    topic: {"$regexMatch": {
+        "input": "$content",
+        "regex": "|".join(re.escape(keyword) for keyword in keywords),
+        "options": "i"
+    }}
+    for topic, keywords in _TOPIC_KEYWORDS.items()
+}
+
+# Stored feedback items whose sentiment can only be found from their content
+_CONTENT_SENTIMENT_FILTER = {
+    "sentiment": {"$exists": False},
+    "type": {"$nin": ["like", "dislike"]},
+    "$nor": [{"type": "rating", "value": {"$ne": None}}]
+}
+
+
+# Client shared by every analyzer so the connection pool lives as long as the process
+_CLIENT: Optional[AsyncIOMotorClient] = None
+_CLIENT_LOCK = asyncio.Lock()
+
+
+async def get_client(mongo_config: Dict[str, Any]) -> AsyncIOMotorClient:
+    """Get the shared MongoDB client, creating it on first use.
+    
+    Args:
+        mongo_config: The `databases.mongodb` configuration section
+        
+    Returns:
+        Shared async MongoDB client
+    """
+    global _CLIENT
+    async with _CLIENT_LOCK:
+        if _CLIENT is None:
+            _CLIENT = AsyncIOMotorClient(
+                mongo_config.get('uri', 'mongodb://localhost:27017'),
+                maxPoolSize=mongo_config.get('pool_size', 100),
+                minPoolSize=mongo_config.get('min_pool_size', 10)
+            )
+            logger.info("Connected to MongoDB")
+    return _CLIENT
+
+
+def close_client() -> None:
+    """Close the shared MongoDB client and its connection pool."""
+    global _CLIENT
+    if _CLIENT is not None:
+        _CLIENT.close()
+        _CLIENT = None
+
 
 class FeedbackAnalyzer:
     """Analyzer for user feedback and interactions."""
     
+    # Sentiment of each whole rating on the 5-point scale
+    _RATING_SENTIMENT = {1: "negative", 2: "negative", 3: "neutral", 4: "positive", 5: "positive"}
+    
+    # Sentiment implied by the feedback type alone
+    _TYPE_SENTIMENT = {"like": "positive", "dislike": "negative"}
+    
     def __init__(self, config: Dict[str, Any]):
         """Initialize the feedback analyzer.
         
@@ -33,13 +144,48 @@ class FeedbackAnalyzer:
         self.mongo_uri = config.get('databases', {}).get('mongodb', {}).get('uri', 'mongodb://localhost:27017')
         self.mongo_db = config.get('databases', {}).get('mongodb', {}).get('db', 'knowledge_platform')
         
+        # Documents fetched per round trip when streaming feedback content
+        self.batch_size = config.get('databases', {}).get('mongodb', {}).get('batch_size', 1000)
+        
+        # A time range is analyzed as this many windows queried concurrently,
+        # with at most `max_concurrency` queries running at once
+        self.time_windows = config.get('feedback_analysis', {}).get('time_windows', 8)
+        self._query_semaphore = asyncio.Semaphore(
+            config.get('databases', {}).get('mongodb', {}).get('max_concurrency', 8)
+        )
+        
+        # Results of filter-based analyses, reused for repeated requests
+        # within the TTL and dropped whenever feedback is stored
+        self.result_cache_ttl = config.get('feedback_analysis', {}).get('result_cache_ttl', 60)
+        self.result_cache_size = config.get('feedback_analysis', {}).get('result_cache_size', 64)
+        self._result_cache = OrderedDict()
+        
         # Initialize MongoDB client
         self.client = None
         self.db = None
+        self._indexes_built = False
         
         # Feedback types
         self.feedback_types = ["rating", "like", "dislike", "correction", "addition", "comment"]
         
+        # With pyahocorasick installed, find every sentiment word and topic
+        # keyword in a piece of content in one pass
+        self._keyword_automaton = None
+        if ahocorasick is not None:
+            labels: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
+            for word in _POSITIVE_WORDS:
+                labels[word].append(("sentiment", "positive"))
+            for word in _NEGATIVE_WORDS:
+                labels[word].append(("sentiment", "negative"))
+            for topic, keywords in _TOPIC_KEYWORDS.items():
+                for keyword in keywords:
+                    labels[keyword].append(("topic", topic))
+                    
+            self._keyword_automaton = ahocorasick.Automaton()
+            for keyword, keyword_labels in labels.items():
+                self._keyword_automaton.add_word(keyword, (keyword, tuple(keyword_labels)))
+            self._keyword_automaton.make_automaton()
+        
         logger.info("Feedback analyzer initialized")
     
     async def analyze(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -62,97 +208,172 @@ class FeedbackAnalyzer:
             
         logger.info(f"Analyzing feedback of type {feedback_type or 'all'}")
         
+        # Analyses of stored feedback are served from the cache while fresh
+        cache_key = self._cache_key(task_data)
+        if cache_key is not None:
+            cached = self._get_cached_result(cache_key)
+            if cached is not None:
+                logger.info("Returning cached feedback analysis")
+                return cached
+        
         # Connect to MongoDB
-        self._connect()
+        await self._connect()
         
-        try:
-            # Process feedback based on input type
-            if feedback_data:
-                # Analyze specific feedback data
-                analysis = self._analyze_feedback_data(feedback_data)
-                
-                # Store the feedback in the database
-                await self._store_feedback(feedback_data)
-                
-            else:
-                # Analyze feedback based on filter criteria
-                feedback_items = await self._get_feedback(
-                    feedback_type, time_range, user_id, content_id
-                )
-                
-                # Analyze the retrieved feedback
-                analysis = self._analyze_feedback_data(feedback_items)
+        # Process feedback based on input type
+        if feedback_data:
+            # Analyze specific feedback data
+            analysis = self._analyze_feedback_data(feedback_data)
             
-            # Generate insights from the analysis
-            insights = self._generate_insights(analysis)
+            # Store the feedback in the database
+            await self._store_feedback(feedback_data)
             
-            # Determine actions based on insights
-            recommended_actions = self._recommend_actions(insights)
+        else:
+            # Analyze feedback based on filter criteria, in the database
+            query = self._build_query(feedback_type, time_range, user_id, content_id)
+            analysis = await self._aggregate_feedback(query, time_range)
+        
+        # Generate insights from the analysis
+        insights = self._generate_insights(analysis)
+        
+        # Determine actions based on insights
+        recommended_actions = self.recommend_actions(insights)
+        
+        result = {
+            "operation_id": str(uuid.uuid4()),
+            "timestamp": datetime.now().isoformat(),
+            "feedback_type": feedback_type,
+            "feedback_count": analysis["feedback_count"],
+            "analysis": analysis,
+            "insights": insights,
+            "recommended_actions": recommended_actions
+        }
+        if cache_key is not None:
+            self._cache_result(cache_key, result)
             
-            return {
-                "operation_id": str(uuid.uuid4()),
-                "timestamp": datetime.now().isoformat(),
-                "feedback_type": feedback_type,
-                "feedback_count": analysis["feedback_count"],
-                "analysis": analysis,
-                "insights": insights,
-                "recommended_actions": recommended_actions
-            }
+        return result
+    
+    def _cache_key(self, task_data: Dict[str, Any]) -> Optional[Tuple]:
+        """Get the result cache key for an analysis task.
+        
+        Args:
+            task_data: Task data specifying feedback to analyze
+            
+        Returns:
+            Filter criteria of the task, or None if it analyzes given feedback
+        """
+        if task_data.get('feedback_data'):
+            return None
+            
+        return (
+            task_data.get('feedback_type'),
+            tuple(sorted((task_data.get('time_range') or {}).items())),
+            task_data.get('user_id'),
+            task_data.get('content_id')
+        )
+    
+    def _get_cached_result(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        """Get a copy of a cached analysis result if it is still fresh.
+        
+        Args:
+            key: Filter criteria the result was computed for
             
-        finally:
-            # Close the MongoDB connection
-            self._close()
+        Returns:
+            Cached analysis results, or None if missing or expired
+        """
+        entry = self._result_cache.get(key)
+        if entry is None:
+            return None
+            
+        cached_at, result = entry
+        if time.monotonic() - cached_at >= self.result_cache_ttl:
+            del self._result_cache[key]
+            return None
+            
+        self._result_cache.move_to_end(key)
+        return copy.deepcopy(result)
+    
+    def _cache_result(self, key: Tuple, result: Dict[str, Any]) -> None:
+        """Cache an analysis result, evicting the least recently used one when full.
+        
+        Args:
+            key: Filter criteria the result was computed for
+            result: Analysis results
+        """
+        self._result_cache[key] = (time.monotonic(), copy.deepcopy(result))
+        self._result_cache.move_to_end(key)
+        while len(self._result_cache) > self.result_cache_size:
+            self._result_cache.popitem(last=False)
     
-    def _connect(self) -> None:
+    async def _connect(self) -> None:
         """Connect to MongoDB."""
         if self.client is None:
-            self.client = MongoClient(self.mongo_uri)
+            self.client = await get_client(self.config.get('databases', {}).get('mongodb', {}))
             self.db = self.client[self.mongo_db]
-            logger.info("Connected to MongoDB")
+            
+        if not self._indexes_built:
+            await self._ensure_indexes()
+            self._indexes_built = True
     
-    def _close(self) -> None:
-        """Close the MongoDB connection."""
-        if self.client:
-            self.client.close()
-            self.client = None
-            self.db = None
+    async def _ensure_indexes(self) -> None:
+        """Create the indexes feedback queries filter with."""
+        try:
+            await self.db.feedback.create_indexes([
+                IndexModel([('type', 1), ('timestamp', -1)]),
+                IndexModel([('user_id', 1), ('timestamp', -1)]),
+                IndexModel([('content_id', 1), ('timestamp', -1)]),
+                IndexModel([('timestamp', -1)])
+            ])
+        except Exception as e:
+            logger.warning(f"Could not create feedback indexes: {e}")
     
-    async def _store_feedback(self, feedback_data: Any) -> str:
+    async def _store_feedback(self, feedback_data: Any) -> List[str]:
         """Store feedback in the database.
         
+        All items are sent in one unordered bulk insert, so one bad item
+        does not stop the others from being stored.
+        
         Args:
             feedback_data: Feedback data to store
             
         Returns:
-            ID of the stored feedback
+            IDs of the stored feedback
         """
         # Ensure we have a list of feedback items
         if not isinstance(feedback_data, list):
             feedback_data = [feedback_data]
             
-        # Insert feedback items
-        feedback_ids = []
-        for item in feedback_data:
-            # Add metadata
-            if 'timestamp' not in item:
-                item['timestamp'] = datetime.now().isoformat()
-                
+        if not feedback_data:
+            return []
+            
+        # Stored feedback changes what cached analyses would count
+        self._result_cache.clear()
+            
+        # Add metadata; generated ids share one random prefix per batch
+        timestamp = datetime.now(timezone.utc)
+        id_prefix = uuid.uuid4().hex
+        for index, item in enumerate(feedback_data):
+            item.setdefault('timestamp', timestamp)
             if 'id' not in item:
-                item['id'] = str(uuid.uuid4())
-                
-            # Insert into MongoDB
-            try:
-                self.db.feedback.insert_one(item)
-                feedback_ids.append(item['id'])
-                logger.debug(f"Stored feedback with ID {item['id']}")
-            except Exception as e:
-                logger.error(f"Error storing feedback: {e}")
-                
+                item['id'] = f"{id_prefix}-{index}"
+            
+        # Insert into MongoDB
+        failed = set()
+        try:
+            await self.db.feedback.insert_many(feedback_data, ordered=False)
+        except BulkWriteError as e:
+            failed = {error['index'] for error in e.details.get('writeErrors', [])}
+            logger.error(f"Error storing {len(failed)} feedback items: {e}")
+        except Exception as e:
+            logger.error(f"Error storing feedback: {e}")
+            return []
+            
+        feedback_ids = [item['id'] for index, item in enumerate(feedback_data) if index not in failed]
+        logger.debug(f"Stored {len(feedback_ids)} feedback items")
         return feedback_ids
     
-    async def _get_feedback(self, feedback_type: Optional[str], time_range: Dict[str, Any], 
-                          user_id: Optional[str], content_id: Optional[str]) -> List[Dict[str, Any]]:
-        """Get feedback from the database based on filter criteria.
+    def _build_query(self, feedback_type: Optional[str], time_range: Dict[str, Any], 
+                     user_id: Optional[str], content_id: Optional[str]) -> Dict[str, Any]:
+        """Build a feedback query from filter criteria.
         
         Args:
             feedback_type: Type of feedback to filter by
@@ -161,9 +382,8 @@ class FeedbackAnalyzer:
             content_id: Content ID to filter by
             
         Returns:
-            List of feedback items
+            MongoDB query
         """
-        # Build query based on filter criteria
         query = {}
         
         if feedback_type:
@@ -175,36 +395,233 @@ class FeedbackAnalyzer:
         if content_id:
             query['content_id'] = content_id
             
-        if time_range:
-            time_query = {}
-            if 'start' in time_range:
-                time_query['$gte'] = time_range['start']
-            if 'end' in time_range:
-                time_query['$lte'] = time_range['end']
+        if time_range and ('start' in time_range or 'end' in time_range):
+            query.update(self._time_filter(time_range.get('start'), time_range.get('end')))
                 
-            if time_query:
-                query['timestamp'] = time_query
+        return query
+    
+    def _time_filter(self, start: Any, end: Any, end_op: str = '$lte') -> Dict[str, Any]:
+        """Build a query filter for feedback timestamps within a time range.
+        
+        Timestamps are stored as BSON dates, and feedback stored before
+        that has ISO format strings. MongoDB only compares values of the
+        same type, so the range is matched in both forms.
+        
+        Args:
+            start: Start of the range (inclusive), as a datetime or ISO string, or None
+            end: End of the range, as a datetime or ISO string, or None
+            end_op: Comparison operator for the end of the range
+            
+        Returns:
+            MongoDB query filter
+        """
+        date_range = {}
+        string_range = {}
+        for op, bound in (('$gte', start), (end_op, end)):
+            if bound is None:
+                continue
                 
-        # Query the database
-        feedback_items = list(self.db.feedback.find(query))
+            if isinstance(bound, datetime):
+                date_range[op] = bound
+                string_range[op] = bound.isoformat()
+            else:
+                string_range[op] = bound
+                try:
+                    date_range[op] = datetime.fromisoformat(bound)
+                except (ValueError, TypeError):
+                    pass
+                    
+        clauses = [{'timestamp': string_range}]
+        if len(date_range) == len(string_range):
+            clauses.insert(0, {'timestamp': date_range})
+            
+        return {'$or': clauses}
+    
+    def _window_queries(self, query: Dict[str, Any], time_range: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Split a feedback query into queries over consecutive time windows.
         
-        # Simulate async processing
-        await asyncio.sleep(0.1)
+        Only a time range with both ends given is split, into windows of
+        equal length.
+        
+        Args:
+            query: MongoDB query selecting the feedback
+            time_range: Time range of the query
+            
+        Returns:
+            Queries that together select the same feedback
+        """
+        start = time_range.get('start') if time_range else None
+        end = time_range.get('end') if time_range else None
+        if self.time_windows < 2 or start is None or end is None:
+            return [query]
+            
+        try:
+            start_time = start if isinstance(start, datetime) else datetime.fromisoformat(start)
+            end_time = end if isinstance(end, datetime) else datetime.fromisoformat(end)
+            step = (end_time - start_time) / self.time_windows
+        except (ValueError, TypeError):
+            return [query]
+            
+        if not step:
+            return [query]
+            
+        bounds = [start] + [start_time + step * i for i in range(1, self.time_windows)] + [end]
         
-        return feedback_items
+        # Each window includes its start, and the last one the range's end
+        return [
+            {**query, **self._time_filter(bounds[i], bounds[i + 1], '$lt' if i + 1 < self.time_windows else '$lte')}
+            for i in range(self.time_windows)
+        ]
     
-    def _analyze_feedback_data(self, feedback_data: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Analyze feedback data.
+    async def _aggregate_feedback(self, query: Dict[str, Any], time_range: Dict[str, Any]) -> Dict[str, Any]:
+        """Analyze the stored feedback matching a query.
+        
+        A bounded time range is split into windows that are counted
+        concurrently, and their counts are added up.
         
         Args:
-            feedback_data: List of feedback items to analyze
+            query: MongoDB query selecting the feedback
+            time_range: Time range of the query
             
         Returns:
-            Analysis results
+            Analysis results, as from `_analyze_feedback_data`
         """
-        # Initialize analysis structure
-        analysis = {
-            "feedback_count": len(feedback_data),
+        async def count_window(window_query: Dict[str, Any]) -> Dict[str, Any]:
+            async with self._query_semaphore:
+                return await self._count_feedback(window_query)
+                
+        windows = await asyncio.gather(*(
+            count_window(window_query) for window_query in self._window_queries(query, time_range)
+        ))
+        
+        totals = windows[0]
+        for window in windows[1:]:
+            totals["count"] += window["count"]
+            for key, counts in window.items():
+                if key != "count":
+                    totals[key].update(counts)
+                    
+        analysis = self._empty_analysis(totals["count"])
+        analysis["feedback_by_type"] = dict(totals["types"])
+        analysis["sentiment_distribution"].update(totals["sentiments"])
+        analysis["rating_distribution"] = dict(totals["ratings"])
+        analysis["time_analysis"] = {
+            "hourly": dict(totals["hours"]),
+            "daily": dict(totals["days"]),
+            "weekly": dict(totals["weeks"])
+        }
+        
+        # Sort top topics
+        analysis["top_topics"] = dict(totals["topics"].most_common(10))
+        
+        return analysis
+    
+    async def _count_feedback(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        """Count the stored feedback matching a query by each analysis bucket.
+        
+        MongoDB does the counting in one `$facet` pipeline and returns only
+        the counts, including the topics mentioned in the content. The
+        content of an item is only fetched when its sentiment has to be
+        found from it.
+        
+        Args:
+            query: MongoDB query selecting the feedback
+            
+        Returns:
+            Total count, and a Counter per bucket (types, sentiments,
+            ratings, topics, hours, days and weeks)
+        """
+        pipeline = [
+            {"$match": query},
+            {"$facet": {
+                "count": [{"$count": "c"}],
+                "by_type": [{"$group": {"_id": "$type", "c": {"$sum": 1}}}],
+                "by_rating": [
+                    {"$match": {"type": "rating", "value": {"$exists": True}}},
+                    {"$group": {"_id": "$value", "c": {"$sum": 1}}}
+                ],
+                "by_sentiment": [{"$group": {"_id": _SENTIMENT_EXPR, "c": {"$sum": 1}}}],
+                "by_topic": [
+                    {"$match": {"topics": {"$exists": True}}},
+                    {"$unwind": "$topics"},
+                    {"$group": {"_id": "$topics", "c": {"$sum": 1}}}
+                ],
+                "by_content_topic": [
+                    {"$match": {"topics": {"$exists": False}, "content": {"$type": "string"}}},
+                    {"$group": {"_id": None, **{
+                        topic: {"$sum": {"$cond": [expr, 1, 0]}}
+                        for topic, expr in _TOPIC_MATCH_EXPRS.items()
+                    }}}
+                ],
+                "by_time": [
+                    {"$project": {"ts": {"$convert": {
+                        "input": "$timestamp", "to": "date", "onError": None, "onNull": None
+                    }}}},
+                    {"$match": {"ts": {"$ne": None}}},
+                    {"$group": {
+                        "_id": {"h": {"$hour": "$ts"}, "d": {"$isoDayOfWeek": "$ts"}, "w": {"$isoWeek": "$ts"}},
+                        "c": {"$sum": 1}
+                    }}
+                ]
+            }}
+        ]
+        results = await self.db.feedback.aggregate(pipeline, allowDiskUse=True).to_list(length=1)
+        facets = results[0] if results else {}
+        
+        count = facets.get("count")
+        counts = {
+            "count": count[0]["c"] if count else 0,
+            "types": Counter({row["_id"]: row["c"] for row in facets.get("by_type", []) if row["_id"]}),
+            "sentiments": Counter(),
+            "ratings": Counter({row["_id"]: row["c"] for row in facets.get("by_rating", [])}),
+            "topics": Counter({row["_id"]: row["c"] for row in facets.get("by_topic", [])}),
+            "hours": Counter(),
+            "days": Counter(),
+            "weeks": Counter()
+        }
+        
+        for row in facets.get("by_content_topic", []):
+            for topic in _TOPIC_MATCH_EXPRS:
+                if row[topic]:
+                    counts["topics"][topic] += row[topic]
+                    
+        sentiments = counts["sentiments"]
+        for row in facets.get("by_sentiment", []):
+            if row["_id"]:
+                sentiments[row["_id"]] += row["c"]
+                
+        for row in facets.get("by_time", []):
+            bucket, c = row["_id"], row["c"]
+            counts["hours"][bucket["h"]] += c
+            counts["days"][bucket["d"] - 1] += c  # Monday is 0, as from datetime.weekday()
+            counts["weeks"][bucket["w"]] += c
+            
+        # Scan the content of the items without a sentiment found above,
+        # streaming them a batch at a time
+        content_query = {"$and": [query, {"content": {"$type": "string"}}, _CONTENT_SENTIMENT_FILTER]}
+        projection = {"_id": 0, "content": 1}
+        content_sentiments = {}  # Sentiment of content repeated across items
+        async for item in self.db.feedback.find(content_query, projection).batch_size(self.batch_size):
+            content = item['content']
+            if content not in content_sentiments:
+                content_sentiments[content] = self._determine_sentiment(item)
+            sentiment = content_sentiments[content]
+            if sentiment:
+                sentiments[sentiment] += 1
+                    
+        return counts
+    
+    def _empty_analysis(self, feedback_count: int) -> Dict[str, Any]:
+        """Create an analysis structure with no counts yet.
+        
+        Args:
+            feedback_count: Number of feedback items analyzed
+            
+        Returns:
+            Analysis structure
+        """
+        return {
+            "feedback_count": feedback_count,
             "feedback_by_type": {},
             "sentiment_distribution": {
                 "positive": 0,
@@ -219,60 +636,191 @@ class FeedbackAnalyzer:
                 "weekly": {}
             }
         }
+    
+    def _analyze_feedback_data(self, feedback_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Analyze feedback data.
+        
+        Args:
+            feedback_data: List of feedback items to analyze
+            
+        Returns:
+            Analysis results
+        """
+        # Initialize analysis structure
+        analysis = self._empty_analysis(len(feedback_data))
         
-        # Process each feedback item
+        # Project the fields each count needs into columns
+        types = [item.get('type') for item in feedback_data]
+        ratings = [
+            item['value'] for item, feedback_type in zip(feedback_data, types)
+            if feedback_type == 'rating' and 'value' in item
+        ]
+        timestamps = [item['timestamp'] for item in feedback_data if 'timestamp' in item]
+        
+        # Sentiment and topics may need the content, so work them out per item
+        sentiments = []
+        topics = []
+        content_scans = {}  # Scans of content repeated across items
         for item in feedback_data:
-            # Count by type
-            feedback_type = item.get('type')
-            if feedback_type:
-                analysis["feedback_by_type"][feedback_type] = analysis["feedback_by_type"].get(feedback_type, 0) + 1
+            # Scan the content once for both sentiment and topics, if needed
+            content_scan = None
+            if 'content' in item and ('topics' not in item or self._needs_content_sentiment(item)):
+                content = item['content']
+                content_scan = content_scans.get(content)
+                if content_scan is None:
+                    content_scan = content_scans[content] = self._scan_content(content)
             
             # Analyze sentiment
-            sentiment = self._determine_sentiment(item)
+            sentiment = self._determine_sentiment(item, content_scan)
             if sentiment:
-                analysis["sentiment_distribution"][sentiment] = analysis["sentiment_distribution"].get(sentiment, 0) + 1
-                
-            # Process ratings
-            if feedback_type == 'rating' and 'value' in item:
-                rating = item['value']
-                analysis["rating_distribution"][rating] = analysis["rating_distribution"].get(rating, 0) + 1
+                sentiments.append(sentiment)
                 
             # Extract topics
-            topics = self._extract_topics(item)
-            for topic in topics:
-                analysis["top_topics"][topic] = analysis["top_topics"].get(topic, 0) + 1
+            if 'topics' in item:
+                topics.extend(item['topics'])
+            elif content_scan is not None:
+                topics.extend(content_scan[2])
                 
-            # Analyze by time
-            if 'timestamp' in item:
-                try:
-                    timestamp = datetime.fromisoformat(item['timestamp'])
-                    
-                    # Hourly analysis
-                    hour = timestamp.hour
-                    analysis["time_analysis"]["hourly"][hour] = analysis["time_analysis"]["hourly"].get(hour, 0) + 1
-                    
-                    # Daily analysis
-                    day = timestamp.weekday()
-                    analysis["time_analysis"]["daily"][day] = analysis["time_analysis"]["daily"].get(day, 0) + 1
-                    
-                    # Weekly analysis
-                    week = timestamp.isocalendar()[1]
-                    analysis["time_analysis"]["weekly"][week] = analysis["time_analysis"]["weekly"].get(week, 0) + 1
-                    
-                except (ValueError, TypeError):
-                    # Skip time analysis if timestamp is invalid
-                    pass
+        hours, days, weeks = self._time_buckets(timestamps)
+        
+        analysis["feedback_by_type"] = dict(Counter(filter(None, types)))
+        analysis["sentiment_distribution"].update(Counter(sentiments))
+        analysis["rating_distribution"] = dict(Counter(ratings))
+        analysis["time_analysis"] = {
+            "hourly": self._count_buckets(hours),
+            "daily": self._count_buckets(days),
+            "weekly": self._count_buckets(weeks)
+        }
         
         # Sort top topics
-        analysis["top_topics"] = dict(sorted(analysis["top_topics"].items(), key=lambda x: x[1], reverse=True)[:10])
+        analysis["top_topics"] = dict(Counter(topics).most_common(10))
         
         return analysis
     
-    def _determine_sentiment(self, feedback_item: Dict[str, Any]) -> Optional[str]:
+    def _time_buckets(self, timestamps: List[Any]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Get the hour, weekday and ISO week of each valid timestamp.
+        
+        Plain ISO date and time strings are converted all at once with
+        NumPy. If any timestamp takes another form, they are read one by
+        one instead: datetimes are used as they are, and strings are
+        parsed, skipping invalid ones.
+        
+        Args:
+            timestamps: Feedback timestamps
+            
+        Returns:
+            Tuple of (hours, weekdays, ISO weeks)
+        """
+        if timestamps and all(type(t) is str and len(t) >= 10 and t[4] == '-' for t in timestamps):
+            try:
+                with warnings.catch_warnings():
+                    # NumPy only warns about UTC offsets before applying them
+                    warnings.simplefilter('error')
+                    seconds = np.array(timestamps, dtype='datetime64[s]')
+            except (ValueError, Warning):
+                seconds = None
+                
+            if seconds is not None and not np.isnat(seconds).any():
+                days = seconds.astype('datetime64[D]')
+                hours = (seconds - days).astype('timedelta64[h]').astype(np.int64)
+                weekdays = (days.astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+                
+                # The ISO week is the week of the year its Thursday falls in
+                thursdays = days - weekdays + 3
+                year_starts = thursdays.astype('datetime64[Y]').astype('datetime64[D]')
+                weeks = (thursdays - year_starts).astype(np.int64) // 7 + 1
+                
+                return hours, weekdays, weeks
+                
+        hours, weekdays, weeks = [], [], []
+        for t in timestamps:
+            try:
+                timestamp = t if isinstance(t, datetime) else datetime.fromisoformat(t)
+            except (ValueError, TypeError):
+                # Skip time analysis if timestamp is invalid
+                continue
+                
+            hours.append(timestamp.hour)
+            weekdays.append(timestamp.weekday())
+            weeks.append(timestamp.isocalendar()[1])
+            
+        return (
+            np.array(hours, dtype=np.int64),
+            np.array(weekdays, dtype=np.int64),
+            np.array(weeks, dtype=np.int64)
+        )
+    
+    def _count_buckets(self, buckets: np.ndarray) -> Dict[int, int]:
+        """Count how often each time bucket occurs.
+        
+        Args:
+            buckets: Non-negative bucket numbers
+            
+        Returns:
+            Dictionary of bucket number to count, for buckets that occur
+        """
+        counts = np.bincount(buckets)
+        present = np.flatnonzero(counts)
+        return dict(zip(present.tolist(), counts[present].tolist()))
+    
+    def _needs_content_sentiment(self, feedback_item: Dict[str, Any]) -> bool:
+        """Check whether the sentiment of a feedback item depends on its content.
+        
+        Args:
+            feedback_item: Feedback item to check
+            
+        Returns:
+            True if the sentiment is not given by the item's other fields
+        """
+        feedback_type = feedback_item.get('type')
+        return ('sentiment' not in feedback_item and feedback_type not in ('like', 'dislike')
+                and not (feedback_type == 'rating' and feedback_item.get('value') is not None))
+    
+    def _scan_content(self, content: str) -> Tuple[int, int, List[str]]:
+        """Find the sentiment words and topic keywords in feedback content.
+        
+        Each keyword counts once however often it appears.
+        
+        Args:
+            content: Feedback content
+            
+        Returns:
+            Tuple of (positive word count, negative word count, topics)
+        """
+        content_lower = content.lower()
+        
+        if self._keyword_automaton is None:
+            positive_count = sum(1 for word in _POSITIVE_WORDS if word in content_lower)
+            negative_count = sum(1 for word in _NEGATIVE_WORDS if word in content_lower)
+            topics = [
+                topic for topic, keywords in _TOPIC_KEYWORDS.items()
+                if any(keyword in content_lower for keyword in keywords)
+            ]
+            return positive_count, negative_count, topics
+            
+        found = {match for _, match in self._keyword_automaton.iter(content_lower)}
+        positive_count = negative_count = 0
+        found_topics = set()
+        for keyword, labels in found:
+            for kind, name in labels:
+                if kind == "topic":
+                    found_topics.add(name)
+                elif name == "positive":
+                    positive_count += 1
+                else:
+                    negative_count += 1
+                    
+        # Keep the topics in the order they are defined in
+        topics = [topic for topic in _TOPIC_KEYWORDS if topic in found_topics]
+        return positive_count, negative_count, topics
+    
+    def _determine_sentiment(self, feedback_item: Dict[str, Any],
+                             content_scan: Optional[Tuple[int, int, List[str]]] = None) -> Optional[str]:
         """Determine sentiment of a feedback item.
         
         Args:
             feedback_item: Feedback item to analyze
+            content_scan: Result of `_scan_content` for the item, if already scanned
             
         Returns:
             Sentiment category (positive, neutral, negative)
@@ -287,6 +835,11 @@ class FeedbackAnalyzer:
         if feedback_type == 'rating':
             rating = feedback_item.get('value')
             if rating is not None:
+                sentiment = self._RATING_SENTIMENT.get(rating)
+                if sentiment is not None:
+                    return sentiment
+                    
+                # Fractional or out of range ratings
                 if rating > 3:  # Assuming 5-point scale
                     return "positive"
                 elif rating < 3:
@@ -294,24 +847,14 @@ class FeedbackAnalyzer:
                 else:
                     return "neutral"
                     
-        elif feedback_type == 'like':
-            return "positive"
-            
-        elif feedback_type == 'dislike':
-            return "negative"
+        elif feedback_type in self._TYPE_SENTIMENT:
+            return self._TYPE_SENTIMENT[feedback_type]
             
         # For other types, check for sentiment indicators in the content
         if 'content' in feedback_item:
-            content = feedback_item['content']
-            
-            # Simple keyword-based sentiment analysis
-            # In a real implementation, this would use more sophisticated methods
-            positive_words = ['good', 'great', 'excellent', 'helpful', 'useful', 'amazing', 'love']
-            negative_words = ['bad', 'poor', 'terrible', 'unhelpful', 'useless', 'awful', 'hate']
-            
-            content_lower = content.lower()
-            positive_count = sum(1 for word in positive_words if word in content_lower)
-            negative_count = sum(1 for word in negative_words if word in content_lower)
+            if content_scan is None:
+                content_scan = self._scan_content(feedback_item['content'])
+            positive_count, negative_count, _ = content_scan
             
             if positive_count > negative_count:
                 return "positive"
@@ -322,43 +865,6 @@ class FeedbackAnalyzer:
                 
         return None
     
-    def _extract_topics(self, feedback_item: Dict[str, Any]) -> List[str]:
-        """Extract topics from a feedback item.
-        
-        Args:
-            feedback_item: Feedback item to analyze
-            
-        Returns:
-            List of topics
-        """
-        topics = []
-        
-        # Check if topics are explicitly provided
-        if 'topics' in feedback_item:
-            return feedback_item['topics']
-            
-        # Extract from content
-        if 'content' in feedback_item:
-            content = feedback_item['content']
-            
-            # Simple keyword-based topic extraction
-            # In a real implementation, this would use more sophisticated methods
-            topic_keywords = {
-                "interface": ["ui", "interface", "design", "layout", "button", "menu"],
-                "performance": ["speed", "fast", "slow", "performance", "loading"],
-                "accuracy": ["accurate", "correct", "wrong", "accuracy", "error"],
-                "content": ["information", "content", "article", "text", "data"],
-                "search": ["search", "find", "query", "results"],
-                "recommendations": ["recommend", "suggestion", "similar"]
-            }
-            
-            content_lower = content.lower()
-            for topic, keywords in topic_keywords.items():
-                if any(keyword in content_lower for keyword in keywords):
-                    topics.append(topic)
-                    
-        return topics
-    
     def _generate_insights(self, analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Generate insights from the analysis.
         
@@ -440,58 +946,89 @@ class FeedbackAnalyzer:
         
         for insight in insights:
             try:
-                # Validate required fields
-                insight_type = insight.get("type")
-                insight_text = insight.get("insight", "")
-                importance = insight.get("importance", "low")
-                
-                if not insight_type:
+                # Insights of other types need no action
+                handler = self._ACTION_HANDLERS.get(insight.get("type"))
+                if handler is None:
                     continue
                     
-                # Sentiment analysis
-                if (insight_type == "sentiment" and 
-                    importance == "high" and 
-                    any(neg_word in insight_text.lower() for neg_word in ["negative", "poor", "bad"])):
-                    actions.append({
-                        "action": "investigate_negative_feedback",
-                        "description": "Investigate causes of negative feedback",
-                        "priority": "high"
-                    })
-                    
-                # Rating analysis
-                elif insight_type == "rating":
-                    rating_value = insight.get("value")
-                    if rating_value is not None and rating_value < 3.0:
-                        actions.append({
-                            "action": "improve_content_quality", 
-                            "description": "Review and improve content quality",
-                            "priority": "high"
-                        })
-                        
-                # Topic analysis - safer extraction
-                elif insight_type == "topic":
-                    # Extract topic name more safely
-                    topic_name = self._extract_topic_name(insight_text)
-                    actions.append({
-                        "action": "enhance_topic_coverage",
-                        "description": f"Enhance coverage of topic: {topic_name}",
-                        "priority": "medium"
-                    })
-                    
-                # Time-based analysis
-                elif insight_type == "time":
-                    actions.append({
-                        "action": "optimize_availability",
-                        "description": "Optimize system availability during peak hours", 
-                        "priority": "low"
-                    })
+                action = handler(self, insight)
+                if action:
+                    actions.append(action)
                     
-            except Exception as e:
+            except Exception:
                 # Log error but continue processing other insights
-                print(f"Error processing insight: {e}")
+                logger.exception("Error processing insight")
                 continue
                 
         return actions
+    
+    def _sentiment_action(self, insight: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Recommend an action for a sentiment insight.
+        
+        Args:
+            insight: Sentiment insight
+            
+        Returns:
+            Recommended action, or None if no action is needed
+        """
+        if (insight.get("importance", "low") == "high" and
+                _NEGATIVE_INSIGHT_RE.search(insight.get("insight", ""))):
+            return {
+                "action": "investigate_negative_feedback",
+                "description": "Investigate causes of negative feedback",
+                "priority": "high"
+            }
+        return None
+    
+    def _rating_action(self, insight: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Recommend an action for a rating insight.
+        
+        Args:
+            insight: Rating insight
+            
+        Returns:
+            Recommended action, or None if no action is needed
+        """
+        rating_value = insight.get("value")
+        if rating_value is not None and rating_value < 3.0:
+            return {
+                "action": "improve_content_quality", 
+                "description": "Review and improve content quality",
+                "priority": "high"
+            }
+        return None
+    
+    def _topic_action(self, insight: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Recommend an action for a topic insight.
+        
+        Args:
+            insight: Topic insight
+            
+        Returns:
+            Recommended action
+        """
+        # Extract topic name more safely
+        topic_name = self._extract_topic_name(insight.get("insight", ""))
+        return {
+            "action": "enhance_topic_coverage",
+            "description": f"Enhance coverage of topic: {topic_name}",
+            "priority": "medium"
+        }
+    
+    def _time_action(self, insight: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Recommend an action for a time-based insight.
+        
+        Args:
+            insight: Time-based insight
+            
+        Returns:
+            Recommended action
+        """
+        return {
+            "action": "optimize_availability",
+            "description": "Optimize system availability during peak hours", 
+            "priority": "low"
+        }
 
     def _extract_topic_name(self, insight_text: str) -> str:
         """Safely extract topic name from insight text."""
@@ -503,4 +1040,13 @@ class FeedbackAnalyzer:
         
         # Fallback to taking last word or returning generic
         words = insight_text.split()
-        return words[-1] if words else "unknown topic"
\ No newline at end of file
+        return words[-1] if words else "unknown topic"
+    
+    # Action recommendation function for each insight type, defined after the
+    # methods so it can refer to them
+    _ACTION_HANDLERS = {
+        "sentiment": _sentiment_action,
+        "rating": _rating_action,
+        "topic": _topic_action,
+        "time": _time_action
+    }
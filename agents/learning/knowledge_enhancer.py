@@ -7,16 +7,39 @@ Knowledge enhancer module for improving the knowledge graph based on feedback an
 
 import logging
 import asyncio
+import copy
+import re
 import time
 from typing import Dict, List, Any, Optional, Tuple, Set
 import uuid
+from collections import defaultdict
 from datetime import datetime
-from neo4j import AsyncGraphDatabase
+
+from agents.common.neo4j import get_driver, close_driver, quote_name, NAME_SIMILAR_REL
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 
+# Full-text index over entity names, used to find entities with similar names
+_NAME_INDEX = "entity_name_ft"
+
+# Labels every entity carries; they are not entity types
+_INTERNAL_LABELS = ["Entity"]
+
+# Entity property holding the name the entity's similar pairs were found for
+_SIMILAR_NAME_PROP = "similarity_name"
+
+
+def _name_search(name: str) -> str:
+    """Build a full-text query matching entities that share a word with a name.
+    
+    Only the lowercased words are kept, so no Lucene syntax or operator
+    can appear in the query.
+    """
+    return " ".join(re.findall(r"\w+", name.lower()))
+
+
 class KnowledgeEnhancer:
     """Enhancer for improving the knowledge graph based on feedback and analytics."""
     
@@ -29,12 +52,31 @@ class KnowledgeEnhancer:
         self.config = config
         
         # Neo4j connection settings
-        self.neo4j_uri = config.get('databases', {}).get('neo4j', {}).get('uri', 'bolt://localhost:7687')
-        self.neo4j_user = config.get('databases', {}).get('neo4j', {}).get('user', 'neo4j')
-        self.neo4j_password = config.get('databases', {}).get('neo4j', {}).get('password', 'password')
+        self.neo4j_config = config.get('databases', {}).get('neo4j', {})
+        self.neo4j_database = self.neo4j_config.get('database', 'neo4j')
         
-        # Initialize Neo4j driver
+        # Shared Neo4j driver, fetched on first enhancement
         self.driver = None
+        self._indexes_ready = False
+        self._has_apoc = False
+        
+        # Only one task refreshes the name similarity view at a time
+        self._similarity_lock = asyncio.Lock()
+        
+        # Labels whose id property is indexed, so lookups by id seek instead of scanning
+        self._indexed_labels = {"Entity"}
+        
+        # Entities added to the name similarity view per transaction
+        self.similarity_batch_size = config.get('enhancement', {}).get('similarity_batch_size', 1000)
+        
+        # Entity types are processed concurrently, each on its own session;
+        # a couple of pool connections are left for other users of the driver
+        self._label_semaphore = asyncio.Semaphore(max(1, self.neo4j_config.get('pool_size', 100) - 2))
+        
+        # Graph statistics reused by enhancements within the TTL, as
+        # (monotonic time, statistics); dropped whenever a strategy changes the graph
+        self.stats_ttl = config.get('enhancement', {}).get('stats_ttl', 10)
+        self._stats_cache = None
         
         # Enhancement strategies
         self.strategies = {
@@ -73,55 +115,264 @@ class KnowledgeEnhancer:
         
         # Connect to Neo4j
         await self._connect()
+        await self._ensure_label_indexes(entity_types)
+        
+        # Apply the enhancement strategy
+        strategy_func = self.strategies[strategy_name]
+        enhancement_results = await strategy_func(
+            entity_types, relationship_types, target_entities, feedback_data, model_id
+        )
+        
+        # Get graph statistics after enhancement; cached statistics are
+        # stale once the strategy has changed anything
+        if enhancement_results.get("relationship_count") or enhancement_results.get("entity_count"):
+            self._stats_cache = None
+        stats = await self._get_cached_statistics()
+        
+        return {
+            "operation_id": str(uuid.uuid4()),
+            "timestamp": datetime.now().isoformat(),
+            "strategy": strategy_name,
+            "enhancement_results": enhancement_results,
+            "graph_statistics": stats
+        }
+    
+    async def _connect(self) -> None:
+        """Connect to Neo4j database."""
+        if self.driver is None:
+            try:
+                self.driver = await get_driver(self.neo4j_config)
+                logger.info("Connected to Neo4j")
+            except Exception as e:
+                logger.error(f"Error connecting to Neo4j: {e}")
+                raise
+                
+        if not self._indexes_ready:
+            await self._ensure_indexes()
+            self._has_apoc = await self._detect_apoc()
+            self._indexes_ready = True
+    
+    async def _detect_apoc(self) -> bool:
+        """Check whether the APOC plugin is available on the server.
         
+        Returns:
+            True if APOC procedures can be called
+        """
         try:
-            # Apply the enhancement strategy
-            strategy_func = self.strategies[strategy_name]
-            enhancement_results = await strategy_func(
-                entity_types, relationship_types, target_entities, feedback_data, model_id
-            )
+            async with self._session() as session:
+                result = await session.run("RETURN apoc.version() as version")
+                await result.single()
+            return True
+        except Exception:
+            logger.info("APOC not available, merged entities' relationships are redirected as SAME_TYPE_AS")
+            return False
+    
+    async def _ensure_indexes(self) -> None:
+        """Create the indexes the enhancement strategies look entities up with."""
+        statements = [
+            # Same constraint as the graph builder; every entity has this label
+            "CREATE CONSTRAINT entity_id IF NOT EXISTS FOR (e:Entity) REQUIRE e.id IS UNIQUE",
+            f"CREATE FULLTEXT INDEX {_NAME_INDEX} IF NOT EXISTS FOR (n:Entity) ON EACH [n.name]"
+        ]
+        
+        async with self._session() as session:
+            for statement in statements:
+                try:
+                    result = await session.run(statement)
+                    await result.consume()
+                except Exception as e:
+                    logger.warning(f"Could not create index: {e}")
+    
+    async def _ensure_label_indexes(self, entity_types: List[str]) -> None:
+        """Index the id property of entity types not indexed yet.
+        
+        Args:
+            entity_types: Entity types the strategies look entities up by
+        """
+        new_labels = [label for label in dict.fromkeys(entity_types) if label not in self._indexed_labels]
+        if not new_labels:
+            return
             
-            # Get graph statistics after enhancement
-            stats = await self._get_graph_statistics()
+        async with self._session() as session:
+            for label in new_labels:
+                index_name = "_".join(re.findall(r"\w+", label.lower())) + "_id"
+                try:
+                    result = await session.run(
+                        f"CREATE INDEX {quote_name(index_name)} IF NOT EXISTS FOR (n:{quote_name(label)}) ON (n.id)"
+                    )
+                    await result.consume()
+                    self._indexed_labels.add(label)
+                except Exception as e:
+                    logger.warning(f"Could not create index for {label}: {e}")
+    
+    async def _ensure_similarity_view(self) -> None:
+        """Bring the name similarity view up to date.
+        
+        The view relates each pair of entities where one name contains the
+        other with a single `NAME_SIMILAR` relationship, scored by how much
+        of the longer name the shorter covers. Instead of comparing every
+        entity with every other, each entity is looked up in the name index,
+        which only yields entities sharing a word with it.
+        
+        Each entity records the name its pairs were found for, so only new
+        and renamed entities are looked up; the first call builds the view.
+        Entities are processed a batch at a time, each batch in its own
+        transaction.
+        """
+        stale_query = f"""
+        MATCH (a:Entity)
+        WHERE a.name IS NOT NULL
+        AND (a.{_SIMILAR_NAME_PROP} IS NULL OR a.{_SIMILAR_NAME_PROP} <> a.name)
+        RETURN elementId(a) as element_id, a.name as name
+        LIMIT $batch_size
+        """
+        # Pairs found for an entity's old name are dropped; the lookup finds
+        # the pairs again from either side, so each pair is stored once
+        refresh_query = f"""
+        UNWIND $rows AS row
+        MATCH (a:Entity)
+        WHERE elementId(a) = row.element_id
+        OPTIONAL MATCH (a)-[old:{NAME_SIMILAR_REL}]-()
+        DELETE old
+        WITH DISTINCT a, row
+        CALL {{
+            WITH a, row
+            WITH a, row WHERE row.search <> ''
+            CALL db.index.fulltext.queryNodes('{_NAME_INDEX}', row.search) YIELD node AS b
+            WITH a, b, toLower(a.name) AS a_name, toLower(b.name) AS b_name
+            WHERE a <> b AND (a_name CONTAINS b_name OR b_name CONTAINS a_name)
+            MERGE (a)-[s:{NAME_SIMILAR_REL}]-(b)
+            SET s.score = CASE WHEN size(a_name) < size(b_name)
+                               THEN toFloat(size(a_name)) / size(b_name)
+                               ELSE toFloat(size(b_name)) / size(a_name) END
+            RETURN count(*) as similar
+        }}
+        SET a.{_SIMILAR_NAME_PROP} = a.name
+        RETURN elementId(a) as element_id
+        """
+        
+        async with self._similarity_lock:
+            async with self._session() as session:
+                # The index is populated in the background after creation
+                try:
+                    result = await session.run(f"CALL db.awaitIndex('{_NAME_INDEX}')")
+                    await result.consume()
+                except Exception as e:
+                    logger.warning(f"Could not wait for the name index: {e}")
+                    
+                refreshed = 0
+                while True:
+                    result = await session.run(stale_query, {"batch_size": self.similarity_batch_size})
+                    records = await result.data()
+                    if not records:
+                        break
+                        
+                    # Entities are matched by element id, so entities without
+                    # an id property are marked too
+                    rows = [
+                        {
+                            "element_id": record["element_id"],
+                            "search": _name_search(record["name"]) if isinstance(record["name"], str) else ""
+                        }
+                        for record in records
+                    ]
+                    marked = await session.execute_write(self._write_rows_tx, refresh_query, rows)
+                    refreshed += len(marked)
+                    
+                    # Entities that could not be marked would be returned again
+                    if len(marked) < len(rows):
+                        logger.warning(f"Could not refresh name similarity view for {len(rows) - len(marked)} entities")
+                        break
+                    
+                if refreshed:
+                    # The refresh changed the graph, so cached statistics are stale
+                    self._stats_cache = None
+                    logger.info(f"Refreshed name similarity view for {refreshed} entities")
+    
+    async def _find_similar_name_pairs(self, session, entity_type: str, rel_type: str,
+                                       limit: int) -> List[Dict[str, Any]]:
+        """Find pairs of entities where one name contains the other, and that
+        are not related yet.
+        
+        The pairs are read from the name similarity view, which must be up
+        to date.
+        
+        Args:
+            session: Neo4j session
+            entity_type: Type of both entities
+            rel_type: Relationship type the pairs must not already have
+            limit: Maximum number of pairs
             
-            return {
-                "operation_id": str(uuid.uuid4()),
-                "timestamp": datetime.now().isoformat(),
-                "strategy": strategy_name,
-                "enhancement_results": enhancement_results,
-                "graph_statistics": stats
-            }
+        Returns:
+            Pairs with source and target ids and names
+        """
+        label = quote_name(entity_type)
+        query = f"""
+        MATCH (a:{label})-[:{NAME_SIMILAR_REL}]->(b:{label})
+        WHERE NOT (a)-[:{quote_name(rel_type)}]-(b)
+        RETURN a.id as source_id, b.id as target_id, a.name as source_name, b.name as target_name
+        LIMIT $limit
+        """
+        
+        result = await session.run(query, {"limit": limit})
+        return await result.data()
+    
+    @staticmethod
+    async def _write_rows_tx(tx, query: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Transaction function running an `UNWIND $rows` write query.
+        
+        Passed to `session.execute_write`, so the rows are committed
+        together and the driver retries the transaction on transient errors.
+        
+        Args:
+            tx: Managed transaction
+            query: Cypher query
+            rows: Rows for the query to unwind
             
-        finally:
-            # Close the Neo4j connection
-            await self._close()
+        Returns:
+            Result records as dictionaries
+        """
+        result = await tx.run(query, {"rows": rows})
+        return await result.data()
     
-    async def _connect(self) -> None:
-        """Connect to Neo4j database."""
-        if self.driver is None:
-            self.driver = AsyncGraphDatabase.driver(
-                self.neo4j_uri, 
-                auth=(self.neo4j_user, self.neo4j_password)
-            )
+    async def _for_each_label(self, entity_types: List[str], process, *args) -> List[Dict[str, Any]]:
+        """Run a strategy's step for each entity type concurrently.
+        
+        Sessions cannot be shared between tasks, so each step gets its own.
+        A failing entity type is logged and contributes no results.
+        
+        Args:
+            entity_types: Entity types to process
+            process: Coroutine function taking a session, an entity type and `args`
+            *args: Further arguments for `process`
             
-        # Test the connection
-        try:
-            async with self.driver.session() as session:
-                result = await session.run("RETURN 1 as num")
-                record = await result.single()
-                if record and record.get("num") == 1:
-                    logger.info("Connected to Neo4j")
-                else:
-                    raise Exception("Failed to verify Neo4j connection")
-        except Exception as e:
-            logger.error(f"Error connecting to Neo4j: {e}")
-            raise
+        Returns:
+            The results of all entity types, in entity type order
+        """
+        async def run(entity_type: str) -> List[Dict[str, Any]]:
+            async with self._label_semaphore:
+                try:
+                    async with self._session() as session:
+                        return await process(session, entity_type, *args)
+                except Exception as e:
+                    logger.error(f"Error processing entity type {entity_type}: {e}")
+                    return []
+                    
+        # Each type once, so no two tasks write the same entities
+        results = await asyncio.gather(*(run(entity_type) for entity_type in dict.fromkeys(entity_types)))
+        return [item for items in results for item in items]
+    
+    def _session(self):
+        """Open a session from the driver's pool on the configured database."""
+        return self.driver.session(database=self.neo4j_database)
     
-    async def _close(self) -> None:
-        """Close the Neo4j connection."""
-        if self.driver:
-            await self.driver.close()
-            self.driver = None
+    async def aclose(self) -> None:
+        """Close the shared Neo4j driver.
+        
+        Only called when the owning agent shuts down.
+        """
+        self.driver = None
+        await close_driver()
     
     async def _enhance_add_missing_relationships(self, entity_types: List[str], 
                                               relationship_types: List[str],
@@ -140,81 +391,73 @@ class KnowledgeEnhancer:
         Returns:
             Enhancement results
         """
-        added_relationships = []
-        
         # Default relationship type if none specified
         rel_type = relationship_types[0] if relationship_types else "RELATED_TO"
         
-        async with self.driver.session() as session:
-            # Find entities with similar properties but no direct relationship
-            query = """
-            MATCH (a), (b)
-            WHERE a <> b
-            AND (a:$entity_type) AND (b:$entity_type)
-            AND (a.name IS NOT NULL) AND (b.name IS NOT NULL)
-            AND NOT (a)-[:$rel_type]-(b)
-            AND a.name =~ ('(?i).*' + b.name + '.*') OR b.name =~ ('(?i).*' + a.name + '.*')
-            RETURN a.id as source_id, b.id as target_id, a.name as source_name, b.name as target_name
-            LIMIT 100
-            """
+        if entity_types:
+            await self._ensure_similarity_view()
             
-            for entity_type in entity_types:
-                try:
-                    result = await session.run(
-                        query,
-                        {
-                            "entity_type": entity_type,
-                            "rel_type": rel_type
-                        }
-                    )
-                    
-                    # Process the results
-                    async for record in result:
-                        source_id = record.get("source_id")
-                        target_id = record.get("target_id")
-                        source_name = record.get("source_name")
-                        target_name = record.get("target_name")
-                        
-                        # Create relationship
-                        create_query = """
-                        MATCH (a {id: $source_id}), (b {id: $target_id})
-                        CREATE (a)-[r:$rel_type {id: $rel_id, created_at: datetime(), automatic: true}]->(b)
-                        RETURN r.id as rel_id
-                        """
-                        
-                        rel_id = str(uuid.uuid4())
-                        create_result = await session.run(
-                            create_query,
-                            {
-                                "source_id": source_id,
-                                "target_id": target_id,
-                                "rel_type": rel_type,
-                                "rel_id": rel_id
-                            }
-                        )
-                        
-                        rel_record = await create_result.single()
-                        if rel_record:
-                            added_relationships.append({
-                                "source_id": source_id,
-                                "target_id": target_id,
-                                "source_name": source_name,
-                                "target_name": target_name,
-                                "relationship_type": rel_type,
-                                "relationship_id": rel_id,
-                                "confidence": 0.7,
-                                "reason": "Name similarity"
-                            })
-                            
-                except Exception as e:
-                    logger.error(f"Error processing entity type {entity_type}: {e}")
-                    
+        added_relationships = await self._for_each_label(
+            entity_types, self._add_missing_relationships, rel_type
+        )
+        
         return {
             "added_relationships": added_relationships,
             "relationship_count": len(added_relationships),
             "entity_types_processed": entity_types
         }
     
+    async def _add_missing_relationships(self, session, entity_type: str, rel_type: str) -> List[Dict[str, Any]]:
+        """Add relationships between entities of one type with similar names.
+        
+        Args:
+            session: Neo4j session
+            entity_type: Entity type to process
+            rel_type: Relationship type to add
+            
+        Returns:
+            Added relationships
+        """
+        # Find entities with similar names but no direct relationship,
+        # then create all their relationships in one query
+        pairs = await self._find_similar_name_pairs(session, entity_type, rel_type, 100)
+        if not pairs:
+            return []
+            
+        for pair in pairs:
+            pair["rel_id"] = str(uuid.uuid4())
+            
+        label = quote_name(entity_type)
+        create_query = f"""
+        UNWIND $rows AS row
+        MATCH (a:{label} {{id: row.source_id}}), (b:{label} {{id: row.target_id}})
+        CREATE (a)-[r:{quote_name(rel_type)} {{id: row.rel_id, created_at: datetime(), automatic: true}}]->(b)
+        RETURN r.id as rel_id
+        """
+        
+        rows = [
+            {"source_id": pair["source_id"], "target_id": pair["target_id"], "rel_id": pair["rel_id"]}
+            for pair in pairs
+        ]
+        created = {
+            record["rel_id"]
+            for record in await session.execute_write(self._write_rows_tx, create_query, rows)
+        }
+        
+        return [
+            {
+                "source_id": pair["source_id"],
+                "target_id": pair["target_id"],
+                "source_name": pair["source_name"],
+                "target_name": pair["target_name"],
+                "relationship_type": rel_type,
+                "relationship_id": pair["rel_id"],
+                "confidence": 0.7,
+                "reason": "Name similarity"
+            }
+            for pair in pairs if pair["rel_id"] in created
+        ]
+    
     async def _enhance_entity_classifications(self, entity_types: List[str], 
                                            relationship_types: List[str],
                                            target_entities: List[str],
@@ -232,79 +475,102 @@ class KnowledgeEnhancer:
         Returns:
             Enhancement results
         """
-        updated_entities = []
-        
-        async with self.driver.session() as session:
-            # Find entities with ambiguous classifications
-            for entity_type in entity_types:
-                # Find entities with multiple types
-                query = """
-                MATCH (n)
-                WHERE $entity_type IN labels(n)
-                WITH n, labels(n) as types
-                WHERE size(types) > 1
-                RETURN n.id as id, n.name as name, types
-                LIMIT 50
-                """
-                
-                try:
-                    result = await session.run(query, {"entity_type": entity_type})
-                    
-                    async for record in result:
-                        entity_id = record.get("id")
-                        entity_name = record.get("name")
-                        current_types = record.get("types")
-                        
-                        # Determine the most appropriate type based on connections
-                        type_query = """
-                        MATCH (n {id: $entity_id})-[r]-(related)
-                        WITH labels(related) as rel_types, count(*) as rel_count
-                        ORDER BY rel_count DESC
-                        LIMIT 1
-                        RETURN rel_types[0] as suggested_type
-                        """
-                        
-                        type_result = await session.run(type_query, {"entity_id": entity_id})
-                        type_record = await type_result.single()
-                        
-                        if type_record:
-                            suggested_type = type_record.get("suggested_type")
-                            
-                            if suggested_type and suggested_type != entity_type:
-                                # Update the entity's primary type
-                                update_query = """
-                                MATCH (n {id: $entity_id})
-                                REMOVE n:$old_type
-                                SET n:$new_type, n.primary_type = $new_type
-                                RETURN n.id as id
-                                """
-                                
-                                await session.run(
-                                    update_query,
-                                    {
-                                        "entity_id": entity_id,
-                                        "old_type": entity_type,
-                                        "new_type": suggested_type
-                                    }
-                                )
-                                
-                                updated_entities.append({
-                                    "id": entity_id,
-                                    "name": entity_name,
-                                    "old_type": entity_type,
-                                    "new_type": suggested_type,
-                                    "reason": "Connection-based reclassification"
-                                })
-                                
-                except Exception as e:
-                    logger.error(f"Error processing entity type {entity_type}: {e}")
-                    
+        # Find entities with ambiguous classifications
+        updated_entities = await self._for_each_label(entity_types, self._reclassify_entities)
+        
         return {
             "updated_entities": updated_entities,
             "entity_count": len(updated_entities),
             "entity_types_processed": entity_types
         }
     
+    async def _reclassify_entities(self, session, entity_type: str) -> List[Dict[str, Any]]:
+        """Move entities of one type with several types to the type they are most connected to.
+        
+        Args:
+            session: Neo4j session
+            entity_type: Entity type to process
+            
+        Returns:
+            Updated entities
+        """
+        # Every entity has the Entity label, which must never be removed
+        if entity_type in _INTERNAL_LABELS:
+            return []
+            
+        # Find entities with multiple types
+        query = """
+        MATCH (n)
+        WHERE $entity_type IN labels(n)
+        WITH n, [l IN labels(n) WHERE NOT l IN $internal_labels] as types
+        WHERE size(types) > 1
+        RETURN n.id as id, n.name as name, types
+        LIMIT 50
+        """
+        
+        # Fetch all entities before the lookups below, so the session
+        # is free for them instead of holding a half-read result
+        result = await session.run(query, {"entity_type": entity_type, "internal_labels": _INTERNAL_LABELS})
+        records = await result.data()
+        
+        # Collect the reclassifications, then make them in one transaction
+        updates = defaultdict(list)
+        for record in records:
+            entity_id = record.get("id")
+            entity_name = record.get("name")
+            current_types = record.get("types")
+            
+            # Determine the most appropriate type based on connections
+            type_query = f"""
+            MATCH (n:{quote_name(entity_type)} {{id: $entity_id}})-[r]-(related)
+            WHERE type(r) <> '{NAME_SIMILAR_REL}'
+            WITH [l IN labels(related) WHERE NOT l IN $internal_labels] as rel_types, count(*) as rel_count
+            WHERE size(rel_types) > 0
+            ORDER BY rel_count DESC
+            LIMIT 1
+            RETURN rel_types[0] as suggested_type
+            """
+            
+            type_result = await session.run(
+                type_query, {"entity_id": entity_id, "internal_labels": _INTERNAL_LABELS}
+            )
+            type_record = await type_result.single()
+            
+            if type_record:
+                suggested_type = type_record.get("suggested_type")
+                
+                if suggested_type and suggested_type != entity_type:
+                    updates[suggested_type].append({"id": entity_id, "name": entity_name})
+                    
+        if not updates:
+            return []
+            
+        # Labels cannot be parameters, so there is one query per new type
+        async def reclassify(tx):
+            updated = []
+            for suggested_type, rows in updates.items():
+                update_query = f"""
+                UNWIND $rows AS row
+                MATCH (n:{quote_name(entity_type)} {{id: row.id}})
+                REMOVE n:{quote_name(entity_type)}
+                SET n:{quote_name(suggested_type)}, n.primary_type = $new_type
+                RETURN n.id as id, row.name as name
+                """
+                update_result = await tx.run(update_query, {"rows": rows, "new_type": suggested_type})
+                updated.extend(
+                    {
+                        "id": record["id"],
+                        "name": record["name"],
+                        "old_type": entity_type,
+                        "new_type": suggested_type,
+                        "reason": "Connection-based reclassification"
+                    }
+                    for record in await update_result.data()
+                )
+            return updated
+            
+        return await session.execute_write(reclassify)
+    
     async def _enhance_merge_similar_entities(self, entity_types: List[str], 
                                            relationship_types: List[str],
                                            target_entities: List[str],
@@ -322,8 +588,6 @@ class KnowledgeEnhancer:
         Returns:
             Enhancement results
         """
-        merged_entities = []
-        
         # Skip if no entity types specified
         if not entity_types:
             return {
@@ -332,101 +596,100 @@ class KnowledgeEnhancer:
                 "entity_types_processed": []
             }
             
-        async with self.driver.session() as session:
-            for entity_type in entity_types:
-                # Find similar entities based on name
-                query = """
-                MATCH (a:$entity_type), (b:$entity_type)
-                WHERE a.id <> b.id
-                AND a.name IS NOT NULL AND b.name IS NOT NULL
-                AND (
-                    a.name = b.name OR
-                    a.name =~ ('(?i).*' + b.name + '.*') OR
-                    b.name =~ ('(?i).*' + a.name + '.*')
-                )
-                RETURN a.id as id1, b.id as id2, a.name as name1, b.name as name2
-                LIMIT 50
-                """
-                
-                try:
-                    result = await session.run(query, {"entity_type": entity_type})
-                    
-                    async for record in result:
-                        id1 = record.get("id1")
-                        id2 = record.get("id2")
-                        name1 = record.get("name1")
-                        name2 = record.get("name2")
-                        
-                        # Determine which entity to keep (prefer the one with more relationships)
-                        count_query = """
-                        MATCH (a {id: $id1})-[r1]-()
-                        WITH count(r1) as count1
-                        MATCH (b {id: $id2})-[r2]-()
-                        WITH count1, count(r2) as count2
-                        RETURN count1, count2
-                        """
-                        
-                        count_result = await session.run(count_query, {"id1": id1, "id2": id2})
-                        count_record = await count_result.single()
-                        
-                        if count_record:
-                            count1 = count_record.get("count1")
-                            count2 = count_record.get("count2")
-                            
-                            # Keep the entity with more relationships
-                            keep_id = id1 if count1 >= count2 else id2
-                            merge_id = id2 if count1 >= count2 else id1
-                            keep_name = name1 if count1 >= count2 else name2
-                            merge_name = name2 if count1 >= count2 else name1
-                            
-                            # Redirect relationships from the entity to be merged
-                            redirect_query = """
-                            MATCH (merge {id: $merge_id})-[r]->(other)
-                            WHERE NOT (keep {id: $keep_id})-[:SAME_TYPE_AS]->(other)
-                            MATCH (keep {id: $keep_id})
-                            CREATE (keep)-[r2:SAME_TYPE_AS]->(other)
-                            SET r2 = r
-                            WITH r
-                            DELETE r
-                            RETURN count(r) as redirected
-                            """
-                            
-                            redirect_result = await session.run(
-                                redirect_query,
-                                {
-                                    "keep_id": keep_id,
-                                    "merge_id": merge_id
-                                }
-                            )
-                            
-                            # Mark the merged entity
-                            mark_query = """
-                            MATCH (keep {id: $keep_id}), (merge {id: $merge_id})
-                            CREATE (merge)-[r:MERGED_INTO {created_at: datetime()}]->(keep)
-                            SET merge.merged = true, merge.active = false
-                            RETURN r.id as rel_id
-                            """
-                            
-                            await session.run(mark_query, {"keep_id": keep_id, "merge_id": merge_id})
-                            
-                            merged_entities.append({
-                                "keep_id": keep_id,
-                                "keep_name": keep_name,
-                                "merge_id": merge_id,
-                                "merge_name": merge_name,
-                                "entity_type": entity_type,
-                                "reason": "Name similarity"
-                            })
-                            
-                except Exception as e:
-                    logger.error(f"Error processing entity type {entity_type}: {e}")
-                    
+        await self._ensure_similarity_view()
+        merged_entities = await self._for_each_label(entity_types, self._merge_similar_entities)
+        
         return {
             "merged_entities": merged_entities,
             "entity_count": len(merged_entities),
             "entity_types_processed": entity_types
         }
     
+    async def _merge_similar_entities(self, session, entity_type: str) -> List[Dict[str, Any]]:
+        """Merge entities of one type whose names contain each other.
+        
+        Args:
+            session: Neo4j session
+            entity_type: Entity type to process
+            
+        Returns:
+            Merged entity pairs
+        """
+        # Find similar entities based on name, most similar first
+        query = f"""
+        MATCH (a:{quote_name(entity_type)})-[s:{NAME_SIMILAR_REL}]->(b:{quote_name(entity_type)})
+        RETURN a.id as id1, b.id as id2, a.name as name1, b.name as name2
+        ORDER BY s.score DESC
+        LIMIT 50
+        """
+        
+        result = await session.run(query)
+        records = await result.data()
+        
+        # Each entity takes part in at most one merge per run, so
+        # nothing is merged into an entity that is merged away
+        rows = []
+        seen = set()
+        for record in records:
+            id1 = record.get("id1")
+            id2 = record.get("id2")
+            if id1 in seen or id2 in seen:
+                continue
+            seen.update((id1, id2))
+            rows.append({"id1": id1, "id2": id2})
+            
+        if not rows:
+            return []
+            
+        # Keep the entity with more relationships, move the other's
+        # outgoing relationships to it and mark it merged, all
+        # pairs in one transaction
+        label = quote_name(entity_type)
+        if self._has_apoc:
+            # apoc.refactor.from keeps each relationship's type and properties
+            redirect = """
+                AND NOT exists { (keep)-[x]->(other) WHERE type(x) = type(r) }
+                CALL apoc.refactor.from(r, keep) YIELD output
+            """
+        else:
+            redirect = """
+                AND NOT (keep)-[:SAME_TYPE_AS]->(other)
+                CREATE (keep)-[r2:SAME_TYPE_AS]->(other)
+                SET r2 = properties(r)
+                DELETE r
+            """
+        merge_query = f"""
+        UNWIND $rows AS row
+        MATCH (a:{label} {{id: row.id1}}), (b:{label} {{id: row.id2}})
+        WITH a, b,
+             COUNT {{ (a)-[r]-() WHERE type(r) <> '{NAME_SIMILAR_REL}' }} >=
+             COUNT {{ (b)-[r]-() WHERE type(r) <> '{NAME_SIMILAR_REL}' }} AS keep_a
+        WITH CASE WHEN keep_a THEN a ELSE b END AS keep,
+             CASE WHEN keep_a THEN b ELSE a END AS merge
+        CALL {{
+            WITH keep, merge
+            MATCH (merge)-[r]->(other)
+            WHERE other <> keep AND type(r) <> '{NAME_SIMILAR_REL}'
+            {redirect}
+            RETURN count(*) as redirected
+        }}
+        CREATE (merge)-[:MERGED_INTO {{created_at: datetime()}}]->(keep)
+        SET merge.merged = true, merge.active = false
+        RETURN keep.id as keep_id, keep.name as keep_name,
+               merge.id as merge_id, merge.name as merge_name
+        """
+        
+        merged = await session.execute_write(self._write_rows_tx, merge_query, rows)
+        
+        return [
+            {
+                **pair,
+                "entity_type": entity_type,
+                "reason": "Name similarity"
+            }
+            for pair in merged
+        ]
+    
     async def _enhance_temporal_relationships(self, entity_types: List[str], 
                                            relationship_types: List[str],
                                            target_entities: List[str],
@@ -444,85 +707,96 @@ class KnowledgeEnhancer:
         Returns:
             Enhancement results
         """
-        added_relationships = []
-        
         # Set temporal relationship type
         temporal_rel_type = "FOLLOWS"
         
-        async with self.driver.session() as session:
-            for entity_type in entity_types:
-                # Find entities with timestamp properties
-                query = """
-                MATCH (a:$entity_type), (b:$entity_type)
-                WHERE a <> b
-                AND a.timestamp IS NOT NULL AND b.timestamp IS NOT NULL
-                AND NOT (a)-[:$rel_type]->(b)
-                AND a.timestamp < b.timestamp
-                RETURN a.id as before_id, b.id as after_id, a.name as before_name, b.name as after_name,
-                       a.timestamp as before_time, b.timestamp as after_time
-                ORDER BY a.timestamp, b.timestamp
-                LIMIT 100
-                """
-                
-                try:
-                    result = await session.run(
-                        query,
-                        {
-                            "entity_type": entity_type,
-                            "rel_type": temporal_rel_type
-                        }
-                    )
-                    
-                    async for record in result:
-                        before_id = record.get("before_id")
-                        after_id = record.get("after_id")
-                        before_name = record.get("before_name")
-                        after_name = record.get("after_name")
-                        
-                        # Create temporal relationship
-                        create_query = """
-                        MATCH (a {id: $before_id}), (b {id: $after_id})
-                        CREATE (a)-[r:$rel_type {
-                            id: $rel_id, 
-                            created_at: datetime(), 
-                            automatic: true,
-                            time_difference: duration.between(a.timestamp, b.timestamp)
-                        }]->(b)
-                        RETURN r.id as rel_id
-                        """
-                        
-                        rel_id = str(uuid.uuid4())
-                        create_result = await session.run(
-                            create_query,
-                            {
-                                "before_id": before_id,
-                                "after_id": after_id,
-                                "rel_type": temporal_rel_type,
-                                "rel_id": rel_id
-                            }
-                        )
-                        
-                        rel_record = await create_result.single()
-                        if rel_record:
-                            added_relationships.append({
-                                "source_id": before_id,
-                                "target_id": after_id,
-                                "source_name": before_name,
-                                "target_name": after_name,
-                                "relationship_type": temporal_rel_type,
-                                "relationship_id": rel_id,
-                                "reason": "Temporal sequence"
-                            })
-                            
-                except Exception as e:
-                    logger.error(f"Error processing entity type {entity_type}: {e}")
-                    
+        added_relationships = await self._for_each_label(
+            entity_types, self._add_temporal_relationships, temporal_rel_type
+        )
+        
         return {
             "added_relationships": added_relationships,
             "relationship_count": len(added_relationships),
             "entity_types_processed": entity_types
         }
     
+    async def _add_temporal_relationships(self, session, entity_type: str,
+                                          temporal_rel_type: str) -> List[Dict[str, Any]]:
+        """Relate entities of one type in the order of their timestamps.
+        
+        Args:
+            session: Neo4j session
+            entity_type: Entity type to process
+            temporal_rel_type: Relationship type to add
+            
+        Returns:
+            Added relationships
+        """
+        # Find entities with timestamp properties
+        query = f"""
+        MATCH (a:{quote_name(entity_type)}), (b:{quote_name(entity_type)})
+        WHERE a <> b
+        AND a.timestamp IS NOT NULL AND b.timestamp IS NOT NULL
+        AND NOT (a)-[:{quote_name(temporal_rel_type)}]->(b)
+        AND a.timestamp < b.timestamp
+        RETURN a.id as before_id, b.id as after_id, a.name as before_name, b.name as after_name,
+               a.timestamp as before_time, b.timestamp as after_time
+        ORDER BY a.timestamp, b.timestamp
+        LIMIT 100
+        """
+        
+        result = await session.run(query)
+        records = await result.data()
+        
+        # Collect the pairs, then create all their relationships in one transaction
+        pairs = [
+            {
+                "source_id": record.get("before_id"),
+                "target_id": record.get("after_id"),
+                "source_name": record.get("before_name"),
+                "target_name": record.get("after_name"),
+                "rel_id": str(uuid.uuid4())
+            }
+            for record in records
+        ]
+        if not pairs:
+            return []
+            
+        label = quote_name(entity_type)
+        create_query = f"""
+        UNWIND $rows AS row
+        MATCH (a:{label} {{id: row.source_id}}), (b:{label} {{id: row.target_id}})
+        CREATE (a)-[r:{quote_name(temporal_rel_type)} {{
+            id: row.rel_id, 
+            created_at: datetime(), 
+            automatic: true,
+            time_difference: duration.between(a.timestamp, b.timestamp)
+        }}]->(b)
+        RETURN r.id as rel_id
+        """
+        
+        rows = [
+            {"source_id": pair["source_id"], "target_id": pair["target_id"], "rel_id": pair["rel_id"]}
+            for pair in pairs
+        ]
+        created = {
+            record["rel_id"]
+            for record in await session.execute_write(self._write_rows_tx, create_query, rows)
+        }
+        
+        return [
+            {
+                "source_id": pair["source_id"],
+                "target_id": pair["target_id"],
+                "source_name": pair["source_name"],
+                "target_name": pair["target_name"],
+                "relationship_type": temporal_rel_type,
+                "relationship_id": pair["rel_id"],
+                "reason": "Temporal sequence"
+            }
+            for pair in pairs if pair["rel_id"] in created
+        ]
+    
     async def _enhance_enrich_properties(self, entity_types: List[str], 
                                       relationship_types: List[str],
                                       target_entities: List[str],
@@ -546,100 +820,119 @@ class KnowledgeEnhancer:
         if feedback_data and 'entity_properties' in feedback_data:
             properties_to_add = feedback_data['entity_properties']
             
-            async with self.driver.session() as session:
-                for entity_id, properties in properties_to_add.items():
-                    # Check if entity exists
-                    check_query = "MATCH (n {id: $entity_id}) RETURN n.id as id, labels(n) as types"
-                    check_result = await session.run(check_query, {"entity_id": entity_id})
-                    check_record = await check_result.single()
-                    
-                    if check_record:
-                        entity_types = check_record.get("types")
-                        
-                        # Update entity properties
-                        props_str = ", ".join([f"n.{key} = ${key}" for key in properties.keys()])
-                        update_query = f"MATCH (n {{id: $entity_id}}) SET {props_str} RETURN n.id as id"
-                        
-                        params = {"entity_id": entity_id}
-                        params.update(properties)
-                        
-                        update_result = await session.run(update_query, params)
-                        update_record = await update_result.single()
-                        
-                        if update_record:
-                            enriched_entities.append({
-                                "id": entity_id,
-                                "types": entity_types,
-                                "added_properties": list(properties.keys()),
-                                "reason": "User feedback"
-                            })
+            # Update the entities that exist in one transaction; the properties
+            # are a map parameter, so one plan serves any set of keys
+            update_query = """
+            UNWIND $rows AS row
+            MATCH (n:Entity {id: row.entity_id})
+            SET n += row.props
+            RETURN n.id as id, labels(n) as types
+            """
+            rows = [
+                {"entity_id": entity_id, "props": properties}
+                for entity_id, properties in properties_to_add.items()
+            ]
+            
+            async with self._session() as session:
+                updated = await session.execute_write(self._write_rows_tx, update_query, rows)
+                
+            enriched_entities.extend(
+                {
+                    "id": record["id"],
+                    "types": record["types"],
+                    "added_properties": list(properties_to_add[record["id"]].keys()),
+                    "reason": "User feedback"
+                }
+                for record in updated
+            )
         
         # Propagate common properties from related entities
-        async with self.driver.session() as session:
-            for entity_type in entity_types:
-                # Find entities with connections that share common properties
-                query = """
-                MATCH (a:$entity_type)-[r]-(b)
-                WHERE a.name IS NOT NULL AND b.name IS NOT NULL
-                WITH a, b, keys(a) as a_keys, keys(b) as b_keys
-                WHERE size([k in b_keys WHERE NOT k in a_keys]) > 0
-                RETURN a.id as entity_id, a.name as entity_name, 
-                       b.id as related_id, b.name as related_name,
-                       [k in b_keys WHERE NOT k in a_keys] as missing_props
-                LIMIT 50
-                """
-                
-                try:
-                    result = await session.run(query, {"entity_type": entity_type})
-                    
-                    async for record in result:
-                        entity_id = record.get("entity_id")
-                        entity_name = record.get("entity_name")
-                        related_id = record.get("related_id")
-                        related_name = record.get("related_name")
-                        missing_props = record.get("missing_props")
-                        
-                        # Get property values from related entity
-                        prop_query = f"MATCH (b {{id: $related_id}}) RETURN {', '.join(['b.' + prop + ' as ' + prop for prop in missing_props])}"
-                        prop_result = await session.run(prop_query, {"related_id": related_id})
-                        prop_record = await prop_result.single()
-                        
-                        if prop_record:
-                            # Add properties to entity
-                            props_to_add = {}
-                            for prop in missing_props:
-                                value = prop_record.get(prop)
-                                if value is not None:
-                                    props_to_add[prop] = value
-                                    
-                            if props_to_add:
-                                # Update entity
-                                props_str = ", ".join([f"a.{key} = ${key}" for key in props_to_add.keys()])
-                                update_query = f"MATCH (a {{id: $entity_id}}) SET {props_str} RETURN a.id as id"
-                                
-                                params = {"entity_id": entity_id}
-                                params.update(props_to_add)
-                                
-                                await session.run(update_query, params)
-                                
-                                enriched_entities.append({
-                                    "id": entity_id,
-                                    "name": entity_name,
-                                    "related_id": related_id,
-                                    "related_name": related_name,
-                                    "added_properties": list(props_to_add.keys()),
-                                    "reason": "Property propagation"
-                                })
-                                
-                except Exception as e:
-                    logger.error(f"Error processing entity type {entity_type}: {e}")
-                    
+        enriched_entities.extend(await self._for_each_label(entity_types, self._propagate_properties))
+        
         return {
             "enriched_entities": enriched_entities,
             "entity_count": len(enriched_entities),
             "entity_types_processed": entity_types
         }
     
+    async def _propagate_properties(self, session, entity_type: str) -> List[Dict[str, Any]]:
+        """Copy properties that entities of one type lack from related entities.
+        
+        Args:
+            session: Neo4j session
+            entity_type: Entity type to process
+            
+        Returns:
+            Enriched entities
+        """
+        # Find entities with connections that share common properties
+        query = f"""
+        MATCH (a:{quote_name(entity_type)})-[r]-(b)
+        WHERE type(r) <> '{NAME_SIMILAR_REL}'
+        AND a.name IS NOT NULL AND b.name IS NOT NULL
+        WITH a, b, keys(a) as a_keys, [k in keys(b) WHERE k <> '{_SIMILAR_NAME_PROP}'] as b_keys
+        WHERE size([k in b_keys WHERE NOT k in a_keys]) > 0
+        RETURN a.id as entity_id, a.name as entity_name, 
+               b.id as related_id, b.name as related_name,
+               [k in b_keys WHERE NOT k in a_keys] as missing_props,
+               properties(b) as related_props
+        LIMIT 50
+        """
+        
+        result = await session.run(query)
+        records = await result.data()
+        
+        # Collect the properties to copy, then update all entities in one transaction
+        propagated = []
+        rows = []
+        for record in records:
+            missing_props = record.get("missing_props")
+            
+            # The query returns the related entity's properties,
+            # so it needs no second lookup
+            related_props = record.get("related_props") or {}
+            props_to_add = {}
+            for prop in missing_props:
+                value = related_props.get(prop)
+                if value is not None:
+                    props_to_add[prop] = value
+                    
+            if props_to_add:
+                propagated.append({
+                    "id": record.get("entity_id"),
+                    "name": record.get("entity_name"),
+                    "related_id": record.get("related_id"),
+                    "related_name": record.get("related_name"),
+                    "added_properties": list(props_to_add.keys()),
+                    "reason": "Property propagation"
+                })
+                rows.append({"entity_id": record.get("entity_id"), "props": props_to_add})
+                
+        if not propagated:
+            return []
+            
+        update_query = f"""
+        UNWIND $rows AS row
+        MATCH (a:{quote_name(entity_type)} {{id: row.entity_id}})
+        SET a += row.props
+        RETURN a.id as id
+        """
+        await session.execute_write(self._write_rows_tx, update_query, rows)
+        return propagated
+    
+    async def _get_cached_statistics(self) -> Dict[str, Any]:
+        """Get graph statistics, recomputing them when the cached copy is
+        missing or older than `stats_ttl` seconds.
+        
+        Returns:
+            Dictionary of graph statistics
+        """
+        if self._stats_cache is None or time.monotonic() - self._stats_cache[0] >= self.stats_ttl:
+            self._stats_cache = (time.monotonic(), await self._get_graph_statistics())
+            
+        # Callers get a copy, so they cannot change the cached statistics
+        return copy.deepcopy(self._stats_cache[1])
+    
     async def _get_graph_statistics(self) -> Dict[str, Any]:
         """Get statistics about the knowledge graph.
         
@@ -653,15 +946,20 @@ class KnowledgeEnhancer:
             "relationship_types": {}
         }
         
-        async with self.driver.session() as session:
+        async with self._session() as session:
             # Count total nodes
             result = await session.run("MATCH (n) RETURN count(n) as count")
             record = await result.single()
             if record:
                 stats["total_nodes"] = record.get("count")
                 
-            # Count total relationships
-            result = await session.run("MATCH ()-[r]->() RETURN count(r) as count")
+            # Count total relationships, leaving out the name similarity view;
+            # both counts come from the count store
+            result = await session.run(
+                "CALL { MATCH ()-[r]->() RETURN count(r) as total } "
+                f"CALL {{ MATCH ()-[r:{NAME_SIMILAR_REL}]->() RETURN count(r) as view }} "
+                "RETURN total - view as count"
+            )
             record = await result.single()
             if record:
                 stats["total_relationships"] = record.get("count")
@@ -673,19 +971,14 @@ class KnowledgeEnhancer:
                 "UNWIND labels as label "
                 "RETURN label, count(label) as count"
             )
-            node_types = {}
-            async for record in result:
-                node_types[record.get("label")] = record.get("count")
-            stats["node_types"] = node_types
+            stats["node_types"] = dict(await result.values("label", "count"))
             
             # Count relationships by type
             result = await session.run(
                 "MATCH ()-[r]->() "
+                f"WHERE type(r) <> '{NAME_SIMILAR_REL}' "
                 "RETURN type(r) as type, count(r) as count"
             )
-            rel_types = {}
-            async for record in result:
-                rel_types[record.get("type")] = record.get("count")
-            stats["relationship_types"] = rel_types
+            stats["relationship_types"] = dict(await result.values("type", "count"))
             
         return stats 
\ No newline at end of file
@@ -43,7 +43,14 @@ def load_config(config_path: Optional[str] = None) -> Dict[str, Any]:
             "neo4j": {
                 "uri": os.getenv("NEO4J_URI", "bolt://localhost:7687"),
                 "user": os.getenv("NEO4J_USER", "neo4j"),
-                "password": os.getenv("NEO4J_PASSWORD", "password")
+                "password": os.getenv("NEO4J_PASSWORD", "password"),
+                "database": os.getenv("NEO4J_DATABASE", "neo4j"),
+                # Driver connection pool size and records per PULL for reads
+                "pool_size": int(os.getenv("NEO4J_POOL_SIZE", "100")),
+                "fetch_size": int(os.getenv("NEO4J_FETCH_SIZE", "10000")),
+                # Rows per UNWIND write batch and concurrent write batches
+                "batch_size": int(os.getenv("NEO4J_BATCH_SIZE", "10000")),
+                "max_concurrency": int(os.getenv("NEO4J_MAX_CONCURRENCY", "8"))
             },
             "mongodb": {
                 "uri": os.getenv("MONGODB_URI", "mongodb://localhost:27017/"),
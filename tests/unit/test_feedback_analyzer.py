@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Unit tests for the feedback analyzer.
+Tests the bucketing of feedback timestamps into hours, weekdays and ISO weeks.
+"""
+
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from agents.learning.feedback_analyzer import FeedbackAnalyzer
+
+
+class TestTimeBuckets(unittest.TestCase):
+    """Test FeedbackAnalyzer._time_buckets."""
+    
+    def setUp(self):
+        """Set up before each test."""
+        self.analyzer = FeedbackAnalyzer({})
+    
+    def assertBuckets(self, timestamps, expected):
+        """Assert the (hours, weekdays, weeks) buckets of the timestamps."""
+        hours, weekdays, weeks = self.analyzer._time_buckets(timestamps)
+        self.assertEqual(
+            list(zip(hours.tolist(), weekdays.tolist(), weeks.tolist())),
+            expected
+        )
+    
+    def test_iso_weeks_at_year_boundaries(self):
+        """Test that dates near New Year fall in the ISO week of their Thursday."""
+        self.assertBuckets(
+            [
+                "2020-12-31T23:59:59",  # Thursday of week 53 of 2020
+                "2021-01-03T00:00:00",  # Sunday, still week 53 of 2020
+                "2021-01-04T12:00:00",  # Monday of week 1 of 2021
+                "2024-12-30T08:30:00",  # Monday of week 1 of 2025
+                "2027-01-01T15:00:00",  # Friday of week 53 of 2026
+                "2028-01-02T00:00:00"   # Sunday of week 52 of 2027
+            ],
+            [(23, 3, 53), (0, 6, 53), (12, 0, 1), (8, 0, 1), (15, 4, 53), (0, 6, 52)]
+        )
+    
+    def test_dates_before_epoch(self):
+        """Test weekday arithmetic on dates before 1970-01-01."""
+        self.assertBuckets(
+            ["1969-12-31T22:00:00", "1969-12-29", "1900-01-01T01:00:00"],
+            [(22, 2, 1), (0, 0, 1), (1, 0, 1)]
+        )
+    
+    def test_matches_datetime_over_a_range(self):
+        """Test that the vectorized buckets match the datetime module's."""
+        start = datetime(2019, 12, 20)
+        moments = [start + timedelta(hours=7 * i) for i in range(3000)]
+        
+        hours, weekdays, weeks = self.analyzer._time_buckets([m.isoformat() for m in moments])
+        
+        self.assertEqual(hours.tolist(), [m.hour for m in moments])
+        self.assertEqual(weekdays.tolist(), [m.weekday() for m in moments])
+        self.assertEqual(weeks.tolist(), [m.isocalendar()[1] for m in moments])
+    
+    def test_datetimes_and_invalid_strings(self):
+        """Test that datetimes are used as they are and invalid strings are skipped."""
+        self.assertBuckets(
+            [datetime(2021, 1, 3, 5), "not a timestamp", "2021-01-04T06:00:00", None],
+            [(5, 6, 53), (6, 0, 1)]
+        )
+    
+    def test_utc_offsets_keep_local_time(self):
+        """Test that timestamps with UTC offsets are bucketed by their local time."""
+        self.assertBuckets(
+            ["2021-01-03T23:30:00+02:00", "2021-01-04T01:00:00"],
+            [(23, 6, 53), (1, 0, 1)]
+        )
+    
+    def test_empty(self):
+        """Test that no timestamps give empty buckets."""
+        self.assertBuckets([], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Unit tests for the graph builder's Cypher queries.
+Tests the query builders and the quoting of labels and index names.
+"""
+
+import os
+import sys
+import asyncio
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from agents.common.neo4j import quote_name
+from agents.knowledge.graph_builder import GraphBuilder
+
+
+class FakeResult:
+    """Result of a query run on a FakeSession."""
+    
+    async def consume(self):
+        """Discard the rest of the result."""
+        return None
+
+
+class FakeSession:
+    """Session recording the queries run on it."""
+    
+    def __init__(self):
+        """Start with no queries run."""
+        self.queries = []
+    
+    async def run(self, query, parameters=None, **kwargs):
+        """Record a query."""
+        self.queries.append(query)
+        return FakeResult()
+
+
+class TestQuoteName(unittest.TestCase):
+    """Test quote_name."""
+    
+    def test_plain_name(self):
+        """Test that a plain name is wrapped in backticks."""
+        self.assertEqual(quote_name("Person"), "`Person`")
+    
+    def test_spaces(self):
+        """Test that names with spaces become a single quoted name."""
+        self.assertEqual(quote_name("Research Area"), "`Research Area`")
+    
+    def test_backticks_are_doubled(self):
+        """Test that backticks cannot end the quoted name early."""
+        self.assertEqual(quote_name("a`b"), "`a``b`")
+        self.assertEqual(quote_name("`) DETACH DELETE (n"), "```) DETACH DELETE (n`")
+        self.assertEqual(quote_name("`"), "````")
+
+
+class TestCypherBuilders(unittest.TestCase):
+    """Test the graph builder's write query builders."""
+    
+    def test_entity_query_merges_on_entity(self):
+        """Test that entities are merged on the constrained Entity label."""
+        query = GraphBuilder._build_entity_cypher("Person")
+        
+        self.assertTrue(query.startswith("UNWIND $rows AS row "))
+        self.assertIn("MERGE (e:Entity {id: row.id})", query)
+        self.assertIn("SET e:Person, e.source_id = coalesce($source_id, e.source_id)", query)
+        self.assertNotIn("MERGE (e:Person", query)
+    
+    def test_relationship_query(self):
+        """Test that relationships are merged between nodes of the given labels."""
+        query = GraphBuilder._build_relationship_cypher("WORKS_AT", "Person", "Organization")
+        
+        self.assertIn("MATCH (from:Person {id: row.from_id})", query)
+        self.assertIn("MATCH (to:Organization {id: row.to_id})", query)
+        self.assertIn("MERGE (from)-[r:WORKS_AT {id: row.id}]->(to)", query)
+        self.assertNotIn("RETURN", query)
+    
+    def test_relationship_query_returning_ids(self):
+        """Test that the written ids are collected into one record when requested."""
+        query = GraphBuilder._build_relationship_cypher("WORKS_AT", "Person", "Organization", return_ids=True)
+        
+        self.assertTrue(query.endswith(" RETURN collect(r.id) as ids"))
+    
+    def test_prebuilt_queries_match_builders(self):
+        """Test that the memoized queries are the ones the builders produce."""
+        builder = GraphBuilder({})
+        
+        for label, query in builder._entity_cypher.items():
+            self.assertEqual(query, GraphBuilder._build_entity_cypher(label))
+
+
+class TestLabelIndex(unittest.TestCase):
+    """Test GraphBuilder._ensure_label_index."""
+    
+    def setUp(self):
+        """Set up before each test."""
+        self.builder = GraphBuilder({})
+        self.session = FakeSession()
+    
+    def test_index_name_and_label_are_quoted(self):
+        """Test that the index name keeps only words and both names are quoted."""
+        asyncio.run(self.builder._ensure_label_index(self.session, "Research Area`s"))
+        
+        self.assertEqual(self.session.queries, [
+            "CREATE INDEX `research_area_s_id` IF NOT EXISTS FOR (n:`Research Area``s`) ON (n.id)"
+        ])
+    
+    def test_index_created_once(self):
+        """Test that a label's index is only created the first time."""
+        asyncio.run(self.builder._ensure_label_index(self.session, "Person"))
+        asyncio.run(self.builder._ensure_label_index(self.session, "Person"))
+        
+        self.assertEqual(self.session.queries, [
+            "CREATE INDEX `person_id` IF NOT EXISTS FOR (n:`Person`) ON (n.id)"
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
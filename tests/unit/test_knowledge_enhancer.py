@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Unit tests for the knowledge enhancer.
+Tests the full-text name search, the selection of entities to merge and the
+handling of write transaction results, without a Neo4j server.
+"""
+
+import os
+import sys
+import asyncio
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from agents.learning.knowledge_enhancer import KnowledgeEnhancer, _name_search
+
+
+class FakeResult:
+    """Result of a query, holding its records."""
+    
+    def __init__(self, records):
+        """Hold the records the query returns."""
+        self.records = records
+    
+    async def data(self):
+        """Return the records as dictionaries."""
+        return list(self.records)
+
+
+class FakeTransaction:
+    """Managed transaction recording the queries run in it."""
+    
+    def __init__(self, records=None):
+        """Return the given records from every query."""
+        self.records = records or []
+        self.runs = []
+    
+    async def run(self, query, parameters=None):
+        """Record a query and its parameters."""
+        self.runs.append((query, parameters))
+        return FakeResult(self.records)
+
+
+class FakeSession:
+    """Session returning fixed records for reads and for write transactions."""
+    
+    def __init__(self, read_records=None, write_records=None):
+        """Return `read_records` from queries and `write_records` from writes."""
+        self.read_records = read_records or []
+        self.queries = []
+        self.tx = FakeTransaction(write_records)
+        self.write_calls = 0
+    
+    async def run(self, query, parameters=None):
+        """Record a query."""
+        self.queries.append((query, parameters))
+        return FakeResult(self.read_records)
+    
+    async def execute_write(self, transaction_function, *args):
+        """Run a transaction function in the fake transaction."""
+        self.write_calls += 1
+        return await transaction_function(self.tx, *args)
+
+
+class TestNameSearch(unittest.TestCase):
+    """Test _name_search."""
+    
+    def test_words_are_lowercased(self):
+        """Test that the query is the name's lowercased words."""
+        self.assertEqual(_name_search("Marie Curie"), "marie curie")
+    
+    def test_lucene_syntax_is_dropped(self):
+        """Test that no Lucene operator or special character reaches the query."""
+        self.assertEqual(_name_search('C++ (language)'), "c language")
+        self.assertEqual(_name_search('name:"x" AND y~2 OR z*'), "name x and y 2 or z")
+        self.assertEqual(_name_search("a/b\\c-d"), "a b c d")
+    
+    def test_unicode_words_are_kept(self):
+        """Test that non-ASCII letters stay part of their words."""
+        self.assertEqual(_name_search("Café Zürich"), "café zürich")
+    
+    def test_no_words(self):
+        """Test that a name without words gives an empty query."""
+        self.assertEqual(_name_search(" -- "), "")
+
+
+class TestWriteRowsTx(unittest.TestCase):
+    """Test KnowledgeEnhancer._write_rows_tx."""
+    
+    def test_rows_are_bound_and_records_returned(self):
+        """Test that the rows are passed as $rows and the records come back as dictionaries."""
+        records = [{"id": "a", "count": 1}, {"id": "b", "count": 2}]
+        tx = FakeTransaction(records)
+        rows = [{"id": "a"}, {"id": "b"}]
+        
+        result = asyncio.run(KnowledgeEnhancer._write_rows_tx(tx, "UNWIND $rows AS row RETURN row.id as id", rows))
+        
+        self.assertEqual(result, records)
+        self.assertEqual(tx.runs, [("UNWIND $rows AS row RETURN row.id as id", {"rows": rows})])
+    
+    def test_no_records(self):
+        """Test that a query returning nothing gives an empty list."""
+        result = asyncio.run(KnowledgeEnhancer._write_rows_tx(FakeTransaction(), "UNWIND $rows AS row", []))
+        
+        self.assertEqual(result, [])
+
+
+class TestMergeSimilarEntities(unittest.TestCase):
+    """Test KnowledgeEnhancer._merge_similar_entities."""
+    
+    def setUp(self):
+        """Set up before each test."""
+        self.enhancer = KnowledgeEnhancer({})
+    
+    def test_each_entity_merged_at_most_once(self):
+        """Test that pairs sharing an entity with an earlier pair are skipped."""
+        session = FakeSession(
+            read_records=[
+                {"id1": "a", "id2": "b", "name1": "IBM", "name2": "IBM Corp"},
+                {"id1": "b", "id2": "c", "name1": "IBM Corp", "name2": "IBM Corporation"},
+                {"id1": "d", "id2": "e", "name1": "MIT", "name2": "MIT Press"},
+                {"id1": "e", "id2": "a", "name1": "MIT Press", "name2": "IBM"},
+                {"id1": "f", "id2": "g", "name1": "NASA", "name2": "NASA Ames"}
+            ],
+            write_records=[
+                {"keep_id": "a", "keep_name": "IBM", "merge_id": "b", "merge_name": "IBM Corp"}
+            ]
+        )
+        
+        merged = asyncio.run(self.enhancer._merge_similar_entities(session, "Organization"))
+        
+        (_, parameters), = session.tx.runs
+        self.assertEqual(parameters["rows"], [
+            {"id1": "a", "id2": "b"},
+            {"id1": "d", "id2": "e"},
+            {"id1": "f", "id2": "g"}
+        ])
+        self.assertEqual(merged, [{
+            "keep_id": "a", "keep_name": "IBM", "merge_id": "b", "merge_name": "IBM Corp",
+            "entity_type": "Organization", "reason": "Name similarity"
+        }])
+    
+    def test_no_pairs_writes_nothing(self):
+        """Test that no transaction is run when there is nothing to merge."""
+        session = FakeSession()
+        
+        merged = asyncio.run(self.enhancer._merge_similar_entities(session, "Organization"))
+        
+        self.assertEqual(merged, [])
+        self.assertEqual(session.write_calls, 0)
+    
+    def test_label_is_quoted(self):
+        """Test that the entity type is quoted in both queries."""
+        session = FakeSession(read_records=[{"id1": "a", "id2": "b", "name1": "x", "name2": "x y"}])
+        
+        asyncio.run(self.enhancer._merge_similar_entities(session, "Research `Area"))
+        
+        (read_query, _), = session.queries
+        (write_query, _), = session.tx.runs
+        self.assertIn("(a:`Research ``Area`)-[s:NAME_SIMILAR]->(b:`Research ``Area`)", read_query)
+        self.assertIn("MATCH (a:`Research ``Area` {id: row.id1}), (b:`Research ``Area` {id: row.id2})", write_query)
+
+
+if __name__ == '__main__':
+    unittest.main()